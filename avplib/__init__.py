@@ -1,3 +1,11 @@
-from .avplib import AVP, TEMP_DETECTOR
 from .avf import AVFile
+from .temp import TEMP_DETECTOR
 from .units import ASCII_CHARS
+
+# * AVP pulls in OpenCV, it is imported on first use.
+def __getattr__(name: str):
+    if name in ("AVP", "avplib"):
+        from importlib import import_module
+        module = import_module(".avplib", __name__)
+        return module if (name == "avplib") else module.AVP
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,16 @@
 import os
+import json
 import click
 import avplib
-import pygame
-import fpstimer
 import time
+from io import BytesIO
 from rich.console import Console
-from rich.progress import Progress
-from rich.live import Live
-from typing import Tuple, List
+from typing import Tuple, List, Dict, Any, Iterable, Union, BinaryIO, Optional
 # > Local Imports
+# * Only what the options need, the modules of a command are imported when it runs.
 from .avf import AVFile
-from .units import ASCII_CHARS
+from .compression import CODECS, PRESETS, DEFAULT_CODEC
+from .units import ASCII_CHARS, COLOR_MODES, CACHE_SIZE, DECODERS, REDUCERS, DEFAULT_HOST, DEFAULT_PORT
 
 # ! Set Environ
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
@@ -24,20 +24,117 @@ class Console(Console):
 console = Console()
 console = Console(width=console.size.width-1, height=console.size.height)
 
+# ! Params
+class PositionType(click.ParamType):
+    """`90`, `1:30` and `1:02:03.5` are times in seconds, `2700f` is a frame."""
+    name = "position"
+    
+    def convert(self, value, param, ctx) -> Tuple[str, float]:
+        if isinstance(value, tuple):
+            return value
+        text = value.strip().lower()
+        try:
+            if text.endswith("f"):
+                position = ("frame", int(text[:-1]))
+            else:
+                seconds = 0.0
+                for part in text.split(":"):
+                    seconds = seconds * 60 + float(part)
+                position = ("time", seconds)
+        except ValueError:
+            self.fail(f"{value!r} is neither a time ([[hh:]mm:]ss) nor a frame (<n>f).", param, ctx)
+        if position[1] < 0:
+            self.fail(f"{value!r} is negative.", param, ctx)
+        return position
+
+POSITION = PositionType()
+
+# ! Constants
+# * Formats `pygame.mixer.music.play(start=...)` can start at a position, the others are trimmed first.
+SEEKABLE_AUDIO_FORMATS = ["ogg", "mp3"]
+
 # ! Functions
-def play_audio(audio_path: str) -> None:
+def avf_frame(position: Tuple[str, float], fps: float) -> int:
+    """A frame of an ASCII video file for a `PositionType` value."""
+    unit, value = position
+    return int(value) if (unit == "frame") else round(value * fps)
+
+def trim_audio(audio: Union[str, BinaryIO], start: float) -> BytesIO:
+    """The audio from `start` seconds on, as a 16-bit WAV."""
+    import soundfile as sf
+    bio = BytesIO()
+    with sf.SoundFile(audio) as sound_file:
+        sound_file.seek(min(int(start * sound_file.samplerate), sound_file.frames))
+        with sf.SoundFile(bio, "w", sound_file.samplerate, sound_file.channels, "PCM_16", format="WAV") as trimmed:
+            for block in sound_file.blocks(blocksize=sound_file.samplerate, dtype="int16"):
+                trimmed.write(block)
+    bio.seek(0)
+    return bio
+
+def play_audio(audio: Union[str, BinaryIO], audio_format: Optional[str]=None, start: float=0.0) -> None:
+    import pygame
     pygame.init()
     pygame.mixer.pre_init(44100, -16, 2, 2048)
     pygame.mixer.init()
-    pygame.mixer.music.load(audio_path)
-    pygame.mixer.music.play()
+    if (start > 0) and (audio_format not in SEEKABLE_AUDIO_FORMATS):
+        # * `get_pos` of the mixer counts from 0 either way, the video is paced from the same point.
+        audio, audio_format, start = trim_audio(audio, start), "wav", 0.0
+    if isinstance(audio, str):
+        pygame.mixer.music.load(audio)
+    else:
+        pygame.mixer.music.load(audio, audio_format or "")
+    pygame.mixer.music.play(start=start)
 
-def play_video(frames: List[str], fps: int) -> None:
-    fps_timer = fpstimer.FPSTimer(fps)
-    with Live(frames[0], auto_refresh=False, console=console) as live:
-        for frame in frames:
-            live.update(frame, refresh=True)
-            fps_timer.sleep()
+def play_video(
+    runs: Iterable[Tuple[Union[str, "ColorFrame", memoryview], int]],
+    fps: int,
+    renderer: str="ansi",
+    with_audio: bool=False,
+    stats: Optional["PipelineStats"]=None
+) -> "PlaybackStats":
+    """Plays `(frame, repeats)` runs, a repeated frame is drawn once and held."""
+    from .color import ColorFrame
+    from .render import AnsiRenderer
+    from .scheduler import PlaybackScheduler, AudioClock
+    scheduler = PlaybackScheduler(fps, AudioClock() if with_audio else None)
+    if (renderer == "ansi") and (not console.legacy_windows):
+        with AnsiRenderer() as ansi:
+            for frame in scheduler.schedule_runs(runs):
+                st = time.perf_counter()
+                ansi.render(frame)
+                if stats: stats.add("write", time.perf_counter() - st)
+    else:
+        from rich.live import Live
+        from rich.text import Text
+        with Live("", auto_refresh=False, console=console) as live:
+            for frame in scheduler.schedule_runs(runs):
+                st = time.perf_counter()
+                if isinstance(frame, memoryview):
+                    frame = frame.tobytes()[:-1].decode()
+                live.update(Text.from_ansi(str(frame)) if isinstance(frame, ColorFrame) else frame, refresh=True)
+                if stats: stats.add("write", time.perf_counter() - st)
+    return scheduler.stats
+
+def print_playback_stats(stats: "PlaybackStats") -> None:
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Shown Frames[/]: {stats.shown}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Held Frames[/]: {stats.held}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Dropped Frames[/]: {stats.dropped}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Late Frames[/]: {stats.late}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]A/V Drift[/]: {round(stats.drift_avg*1000,1)} [yellow]ms[/] (max {round(stats.drift_max*1000,1)} [yellow]ms[/])")
+
+def print_pipeline_stats(stats: "PipelineStats", report: str, playback: Optional["PlaybackStats"]=None) -> None:
+    data = stats.to_dict()
+    if report == "json":
+        if playback is not None:
+            data["playback"] = playback.to_dict()
+        print(json.dumps(data, indent=4))
+        return
+    for stage, values in data["stages"].items():
+        console.print(
+            f"[#EA00FF]*[/] [#BBFF00]Stage {stage}[/]: {round(values['total'],3)} [yellow]sec[/] " \
+            f"({values['count']} calls, {round(values['mean']*1000,3)} [yellow]ms[/] per call)"
+        )
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Wall Time[/]: {round(data['wall'],3)} [yellow]sec[/]")
 
 # > Convert (in memory) and view
 @click.command("cav", help="Play video files (*.mp4/*.avi/...)")
@@ -59,21 +156,109 @@ def play_video(frames: List[str], fps: int) -> None:
     show_default=True,
     help="FPS at which the video will be played back."
 )
+@click.option(
+    "--start",
+    type=POSITION,
+    default=None,
+    help="Where to start: a time in seconds (90, 1:30, 1:02:03.5) or a frame of the source video (2700f)."
+)
+@click.option(
+    "--end",
+    type=POSITION,
+    default=None,
+    help="Where to stop (excluded), in the same form as --start."
+)
 @click.option(
     "--threading", "-th",
     is_flag=True,
-    help="Enable on threading processing."
+    help="Enable on threading processing (keeps the whole converted video in memory until it is done)."
 )
 @click.option(
     "--multiprocessing", "-mp",
     is_flag=True,
-    help="Enable on multiprocessing."
+    help="Enable on multiprocessing (keeps the whole converted video in memory until it is done)."
+)
+@click.option(
+    "--segmented", "-sg",
+    is_flag=True,
+    help="Enable segment-parallel processing (every process decodes its own part of the video)."
+)
+@click.option(
+    "--stream", "-s",
+    is_flag=True,
+    help="Start playback while the video is still being converted."
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(1),
+    default=128,
+    show_default=True,
+    help="Maximum number of converted frames kept in memory in stream mode."
+)
+@click.option(
+    "--cache_dir", "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory for caching converted videos (disabled by default)."
+)
+@click.option(
+    "--cache_size",
+    type=click.IntRange(1),
+    default=CACHE_SIZE // 2**20,
+    show_default=True,
+    help="Size limit of the cache directories in MB."
+)
+@click.option(
+    "--gray_cache", "--gray-cache",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory for the grayscale frames of videos, other chars and smaller resolutions are mapped from them without decoding again."
+)
+@click.option(
+    "--color", "-c",
+    type=click.Choice(COLOR_MODES),
+    default="none",
+    show_default=True,
+    help="Color mode (256 colors or 24-bit truecolor)."
+)
+@click.option(
+    "--decoder",
+    type=click.Choice(DECODERS),
+    default="opencv",
+    show_default=True,
+    help="Video decoder (ffmpeg scales and converts the frames itself, faster, some chars differ from opencv; falls back to opencv without its binary)."
+)
+@click.option(
+    "--reducer",
+    type=click.Choice(REDUCERS),
+    default="pillow",
+    show_default=True,
+    help="Frame reduction (pillow gives the chars of the original conversion, opencv is about 3 times faster, a few chars differ)."
+)
+@click.option(
+    "--renderer",
+    type=click.Choice(["ansi", "rich"]),
+    default="ansi",
+    show_default=True,
+    help="Terminal renderer (ansi redraws only the changed cells)."
 )
 @click.option(
     "--no_audio", "-na",
     is_flag=True,
     help="Disable audio playback."
 )
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="Print the time spent in every pipeline stage."
+)
+@click.option(
+    "--stats_format", "--stats-format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="Format of the --stats report (json is machine-readable)."
+)
 @click.option(
     "--yes", "-y",
     is_flag=True,
@@ -90,13 +275,32 @@ def cav(
     video_path: str,
     res: Tuple[int, int],
     fps: int,
+    start: Optional[Tuple[str, float]],
+    end: Optional[Tuple[str, float]],
     threading: bool,
     multiprocessing: bool,
+    segmented: bool,
+    stream: bool,
+    prefetch: int,
+    cache_dir: str,
+    cache_size: int,
+    gray_cache: Optional[str],
+    color: str,
+    decoder: str,
+    reducer: str,
+    renderer: str,
     no_audio: bool,
+    stats: bool,
+    stats_format: str,
     yes: bool,
     ascii_chars: List[str]
 ):
+    from .cache import ConversionCache
+    from .gray import GrayCache
+    from .stats import PipelineStats
+    
     multiprocessing = multiprocessing and avplib.avplib.init_multiprocessing
+    segmented = segmented and avplib.avplib.init_multiprocessing
 
     if sum(res) > 0:
         console.set_size((res[0]+1, res[1]))
@@ -110,16 +314,46 @@ def cav(
     console.print(f"[#EA00FF]*[/] [#BBFF00]FPS[/]: {fps}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Enable Threading[/]: {threading}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Enable Multiprocessing[/]: {multiprocessing}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Enable Segmented[/]: {segmented}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Enable Stream[/]: {stream}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Cache Directory[/]: {cache_dir.__repr__()}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Gray Cache Directory[/]: {gray_cache.__repr__()}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Color Mode[/]: {color}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Disable Audio[/]: {no_audio}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]ASCII Chars[/]: {ascii_chars}")
 
-    video = avplib.AVP(video_path, ascii_chars)
+    cache = ConversionCache(cache_dir, cache_size * 2**20) if (cache_dir is not None) else None
+    gray = GrayCache(gray_cache, cache_size * 2**20) if (gray_cache is not None) else None
+    video = avplib.AVP(video_path, ascii_chars, cache, color, decoder, gray, reducer)
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Decoder[/]: {video.decoder}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Reducer[/]: {reducer}")
+    if stats:
+        video.stats = PipelineStats()
     if (fps != 30) and (fps != video.get_fps()):
         video.set_fps(fps)
+    if (start is not None) or (end is not None):
+        video.set_bounds(start, end)
+        console.print(f"[#EA00FF]*[/] [#BBFF00]Source Frames[/]: {'-'.join(map(str, video.get_bounds()))}")
     if not no_audio:
-        audio_path = video.get_audio("file")
+        audio = video.get_audio("stream", audio_format="ogg")
+
+    if stream:
+        console.print("[red](ENTER to continue)[/]")
+        if not yes: input()
+        st = time.time()
+        with video.iter_ascii_runs(res, prefetch) as runs:
+            with console.status("Buffering ASCII"):
+                runs.wait(max(prefetch // 2, 1))
+            et = time.time()
+            console.print(f"[#EA00FF]*[/] [#BBFF00]Time To First Frame[/]: {round(et-st,2)} [yellow]sec[/]")
+            if not no_audio: play_audio(audio, "ogg")
+            playback = play_video(runs, fps, renderer, not no_audio, video.stats)
+        print_playback_stats(playback)
+        if stats: print_pipeline_stats(video.stats, stats_format, playback)
+        return
 
     st = time.time()
+    from rich.progress import Progress
     with Progress(transient=True) as pr:
         gaf = pr.add_task("Generation ASCII")
         def update_bar(complited: int, total: int):
@@ -128,20 +362,24 @@ def cav(
             frames = video.get_ascii_frames_threading(res, callback=update_bar)
         elif multiprocessing:
             frames = video.get_ascii_frames_multiprocessing(res, callback=update_bar)
+        elif segmented:
+            frames = video.get_ascii_frames_segmented(res, callback=update_bar)
         else:
             frames = video.get_ascii_frames(res, callback=update_bar)
     et = time.time()
     
     console.print(f"[#EA00FF]*[/] [#BBFF00]Total Time[/]: {round(et-st,2)} [yellow]sec[/]\n[red](ENTER to continue)[/]")
     if not yes: input()
-    if not no_audio: play_audio(audio_path)
-    play_video(frames, fps)
+    if not no_audio: play_audio(audio, "ogg")
+    playback = play_video(frames.runs(), fps, renderer, not no_audio, video.stats)
+    print_playback_stats(playback)
+    if stats: print_pipeline_stats(video.stats, stats_format, playback)
 
 # > Convert and save
-@click.command("convert", help="Convert Video Files to ASCII Video File.")
+@click.command("convert", help="Convert Video Files to ASCII Video File (a directory or a glob pattern converts every video into TO_VIDEO_PATH).")
 @click.argument(
     "from_video_path",
-    type=click.Path(exists=True, file_okay=True),
+    type=click.Path(),
 )
 @click.argument(
     "to_video_path",
@@ -161,21 +399,103 @@ def cav(
     show_default=True,
     help="FPS for conversion (does not change after conversion)."
 )
+@click.option(
+    "--start",
+    type=POSITION,
+    default=None,
+    help="Where to start: a time in seconds (90, 1:30, 1:02:03.5) or a frame of the source video (2700f)."
+)
+@click.option(
+    "--end",
+    type=POSITION,
+    default=None,
+    help="Where to stop (excluded), in the same form as --start."
+)
 @click.option(
     "--threading", "-th",
     is_flag=True,
-    help="Enable on threading processing."
+    help="Enable on threading processing (keeps the whole converted video in memory until it is done)."
 )
 @click.option(
     "--multiprocessing", "-mp",
     is_flag=True,
-    help="Enable on multiprocessing."
+    help="Enable on multiprocessing (keeps the whole converted video in memory until it is done)."
+)
+@click.option(
+    "--segmented", "-sg",
+    is_flag=True,
+    help="Enable segment-parallel processing (every process decodes its own part of the video)."
+)
+@click.option(
+    "--jobs", "-j",
+    type=click.IntRange(1),
+    default=None,
+    help="Number of files converted at the same time in batch mode (defaults to the number of cores)."
+)
+@click.option(
+    "--overwrite",
+    is_flag=True,
+    help="Convert again the files whose output already exists in batch mode."
 )
 @click.option(
     "--auto_res", "-ar",
     is_flag=True,
     help="Automatically detection resolution."
 )
+@click.option(
+    "--encoding", "-e",
+    type=click.Choice(["raw", "delta", "stored"]),
+    default="raw",
+    show_default=True,
+    help="Frame encoding (delta stores only the changes between frames, stored keeps them uncompressed for memory-mapped playback)."
+)
+@click.option(
+    "--color", "-c",
+    type=click.Choice(COLOR_MODES),
+    default="none",
+    show_default=True,
+    help="Color mode, stored as a char plane and a color plane."
+)
+@click.option(
+    "--decoder",
+    type=click.Choice(DECODERS),
+    default="opencv",
+    show_default=True,
+    help="Video decoder (ffmpeg scales and converts the frames itself, faster, some chars differ from opencv; falls back to opencv without its binary)."
+)
+@click.option(
+    "--reducer",
+    type=click.Choice(REDUCERS),
+    default="pillow",
+    show_default=True,
+    help="Frame reduction (pillow gives the chars of the original conversion, opencv is about 3 times faster, a few chars differ)."
+)
+@click.option(
+    "--gray_cache", "--gray-cache",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory for the grayscale frames of videos, other chars and smaller resolutions are mapped from them without decoding again."
+)
+@click.option(
+    "--codec",
+    type=click.Choice([*PRESETS, *CODECS]),
+    default=DEFAULT_CODEC,
+    show_default=True,
+    help="Compression of the frames: a codec or a preset (fast, balanced, small). zstd and lz4 need their modules."
+)
+@click.option(
+    "--level",
+    type=int,
+    default=None,
+    help="Compression level of the codec (deflate 0-9, bzip2 1-9, zstd 1-22, lz4 0-16, none for stored and lzma)."
+)
+@click.option(
+    "--audio_format",
+    type=click.Choice(["ogg", "flac", "wav"]),
+    default="ogg",
+    show_default=True,
+    help="Audio format stored in the file (flac and wav are lossless)."
+)
 @click.option(
     "--title", "-t",
     help="Set title.",
@@ -193,6 +513,18 @@ def cav(
     is_flag=True,
     help="Disable audio playback."
 )
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="Print the time spent in every pipeline stage."
+)
+@click.option(
+    "--stats_format", "--stats-format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="Format of the --stats report (json is machine-readable)."
+)
 @click.option(
     "--ascii_chars",
     type=list,
@@ -205,33 +537,83 @@ def convert2avf(
     to_video_path: str,
     res: Tuple[int, int],
     fps: int,
+    start: Optional[Tuple[str, float]],
+    end: Optional[Tuple[str, float]],
     threading: bool,
     multiprocessing: bool,
+    segmented: bool,
+    jobs: Optional[int],
+    overwrite: bool,
     auto_res: bool,
+    encoding: str,
+    color: str,
+    decoder: str,
+    reducer: str,
+    gray_cache: Optional[str],
+    codec: str,
+    level: Optional[int],
+    audio_format: str,
     title: str,
     author: str,
     no_audio: bool,
+    stats: bool,
+    stats_format: str,
     ascii_chars: List[str]
 ):
+    from .batch import is_glob
+    from .compression import InvalidLevel, resolve_codec
+    from .gray import GrayCache
+    from .stats import PipelineStats
+    
     multiprocessing = multiprocessing and avplib.avplib.init_multiprocessing
+    segmented = segmented and avplib.avplib.init_multiprocessing
 
     if auto_res:
         res = (console.size.width-1, console.size.height)
     
     if len(ascii_chars) > 256: ascii_chars = ascii_chars[:256]
     
+    try:
+        codec, level = resolve_codec(codec, level)
+    except InvalidLevel as e:
+        raise click.BadParameter(str(e), param_hint="'--level'")
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--codec'")
+    if (encoding == "stored") and (color == "none") and any(len(char.encode()) != 1 for char in ascii_chars):
+        raise click.BadParameter("The stored encoding needs single-byte ASCII chars.", param_hint="'--encoding'")
+    
+    if os.path.isdir(from_video_path) or is_glob(from_video_path):
+        return convert_batch(
+            from_video_path, to_video_path, jobs, overwrite,
+            dict(
+                res=res, fps=fps, ascii_chars=ascii_chars, encoding=encoding, color_mode=color, decoder=decoder,
+                reducer=reducer, codec=codec, level=level, audio_format=audio_format, no_audio=no_audio, title=title, author=author,
+                start=start, end=end
+            )
+        )
+    if not os.path.exists(from_video_path):
+        raise click.BadParameter(f"Path {from_video_path!r} does not exist.", param_hint="'FROM_VIDEO_PATH'")
+    
     console.print(f"[#EA00FF]*[/] [#BBFF00]From Video Path[/]: {os.path.abspath(from_video_path).__repr__()}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]To Video Path[/]: {os.path.abspath(to_video_path).__repr__()}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Resolution[/]: {res[0]}x{res[1]}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]FPS[/]: {fps}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Enable Threading[/]: {threading}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Enable Multiprocessing[/]: {multiprocessing}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Enable Segmented[/]: {segmented}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Disable Audio[/]: {no_audio}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]ASCII Chars[/]: {ascii_chars}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Encoding[/]: {encoding}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Color Mode[/]: {color}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Decoder[/]: {decoder}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Reducer[/]: {reducer}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Gray Cache Directory[/]: {gray_cache.__repr__()}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Codec[/]: {codec} (level {level})")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Title[/]: {title.__repr__()}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Author[/]: {author.__repr__()}")
     
     st = time.time()
+    from rich.progress import Progress
     with Progress(transient=True) as pr:
         preparation = pr.add_task("Creating an archive", total=5)
         gaf = pr.add_task("Generation ASCII")
@@ -239,73 +621,188 @@ def convert2avf(
         def update_bar(complited: int, total: int): pr.update(gaf, total=total, completed=complited)
         
         # * Подготовка
-        avfile = AVFile(to_video_path, "w")
+        avfile = AVFile(to_video_path, "w", codec, level)
         
-        pr.update(preparation, advance=1, description="Preparation Video File")
-        video = avplib.AVP(from_video_path, ascii_chars)
-        if fps != video.get_fps():
-            video.set_fps(fps)
+        # * A file left by an error or an interrupt is removed.
+        try:
+            pr.update(preparation, advance=1, description="Preparation Video File")
+            video = avplib.AVP(
+                from_video_path, ascii_chars, color_mode=color, decoder=decoder, reducer=reducer,
+                gray_cache=GrayCache(gray_cache) if (gray_cache is not None) else None
+            )
+            if stats:
+                video.stats = avfile.stats = PipelineStats()
+            if fps != video.get_fps():
+                video.set_fps(fps)
+            video.set_bounds(start, end)
         
-        pr.update(preparation, advance=1, description="Writing info")
-        avfile.set_info(
-            title,
-            author,
-            fps,
-            res,
-            not(no_audio),
-            ascii_chars
-        )
+            pr.update(preparation, advance=1, description="Writing info")
+            avfile.set_info(
+                title,
+                author,
+                fps,
+                res,
+                not(no_audio),
+                ascii_chars
+            )
         
-        pr.update(preparation, advance=1, description="Compressing audio")
-        if not no_audio: avfile.set_audio_from_path(video.get_audio("file"))
+            pr.update(preparation, advance=1, description="Compressing audio")
+            if not no_audio: avfile.set_audio_from_bytes(video.get_audio("bytes", audio_format=audio_format), audio_format)
         
-        # * Convert
-        pr.update(preparation, advance=1, description="Compressing Video")
-        if threading:
-            frames = video.get_ascii_frames_threading(res, callback=update_bar)
-        elif multiprocessing:
-            frames = video.get_ascii_frames_multiprocessing(res, callback=update_bar)
-        else:
-            frames = video.get_ascii_frames(res, callback=update_bar)
-        pr.remove_task(gaf)
-        avfile.set_video(frames)
+            # * Convert, the frames are compressed into the archive as they come out of the pipeline
+            pr.update(preparation, advance=1, description="Compressing Video")
+            with avfile.open_video_writer(encoding=encoding) as writer:
+                if threading:
+                    writer.write_runs(video.get_ascii_frames_threading(res, callback=update_bar).runs())
+                elif multiprocessing:
+                    writer.write_runs(video.get_ascii_frames_multiprocessing(res, callback=update_bar).runs())
+                elif segmented and video.uses_gray_cache:
+                    writer.write_runs(video.get_ascii_frames_segmented(res, callback=update_bar).runs())
+                elif segmented:
+                    writer.write_runs(video.iter_ascii_runs_segmented(res, callback=update_bar))
+                else:
+                    with video.iter_ascii_runs(res, callback=update_bar) as runs:
+                        writer.write_runs(runs)
+            pr.remove_task(gaf)
         
-        avfile.close()
+            avfile.close()
+        except BaseException:
+            avfile.abort()
+            raise
         pr.update(preparation, advance=1, description="Done!")
     et = time.time()
     
     console.print(f"[#EA00FF]*[/] [#BBFF00]Total Time[/]: {round(et-st,2)} [yellow]sec[/]")
+    if stats: print_pipeline_stats(video.stats, stats_format)
+
+def convert_batch(source: str, output_dir: str, jobs: Optional[int], overwrite: bool, options: Dict[str, Any]) -> None:
+    from .batch import collect_sources, output_path, is_complete, run_batch
+    base, sources = collect_sources(source)
+    targets = [output_path(path, base, output_dir) for path in sources]
+    pending = [(path, target) for path, target in zip(sources, targets) if overwrite or (not is_complete(target))]
+    
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Source[/]: {os.path.abspath(source).__repr__()}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Output Directory[/]: {os.path.abspath(output_dir).__repr__()}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Files[/]: {len(sources)} ({len(sources) - len(pending)} already converted)")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Jobs[/]: {min(jobs or os.cpu_count() or 1, max(len(pending), 1))}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Resolution[/]: {options['res'][0]}x{options['res'][1]}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]FPS[/]: {options['fps']}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Encoding[/]: {options['encoding']}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Color Mode[/]: {options['color_mode']}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Decoder[/]: {options['decoder']}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Reducer[/]: {options['reducer']}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Codec[/]: {options['codec']} (level {options['level']})")
+    
+    st = time.time()
+    failed: List[Tuple[str, str]] = []
+    from rich.progress import Progress
+    with Progress(transient=True) as pr:
+        files_task = pr.add_task("Converting files", total=len(pending))
+        frames_task = pr.add_task("Generation ASCII", total=None)
+        progress: Dict[int, Tuple[int, int]] = {}
+        
+        def update_frames(idx: int, done: int, total: int) -> None:
+            progress[idx] = (done, total)
+            pr.update(
+                frames_task,
+                completed=sum(done for done, total in progress.values()),
+                total=sum(total for done, total in progress.values())
+            )
+        
+        def update_files(result) -> None:
+            idx, frames, seconds, error = result
+            if error is not None:
+                failed.append((pending[idx][0], error))
+            pr.update(files_task, advance=1)
+        
+        run_batch(pending, options, jobs, update_frames, update_files)
+    et = time.time()
+    
+    for path, error in failed:
+        console.print(f"[#EA00FF]*[/] [red]Failed[/]: {path.__repr__()} ({error})")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Converted Files[/]: {len(pending) - len(failed)}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Total Time[/]: {round(et-st,2)} [yellow]sec[/]")
 
 @click.command("play", help="Play ASCII Video.")
 @click.argument(
     "ascii_video_path",
     type=click.Path(exists=True, file_okay=True),
 )
+@click.option(
+    "--renderer",
+    type=click.Choice(["ansi", "rich"]),
+    default="ansi",
+    show_default=True,
+    help="Terminal renderer (ansi redraws only the changed cells)."
+)
+@click.option(
+    "--start",
+    type=POSITION,
+    default=None,
+    help="Where to start: a time in seconds (90, 1:30, 1:02:03.5) or a frame of the file (2700f)."
+)
+@click.option(
+    "--end",
+    type=POSITION,
+    default=None,
+    help="Where to stop (excluded), in the same form as --start."
+)
 @click.option(
     "--no_audio", "-na",
     is_flag=True,
     help="Disable audio playback."
 )
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="Print the time spent in every pipeline stage."
+)
+@click.option(
+    "--stats_format", "--stats-format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="Format of the --stats report (json is machine-readable)."
+)
 @click.option(
     "--yes", "-y",
     is_flag=True,
     help="Disable playback confirmation."
 )
-def play_avf(ascii_video_path: str, no_audio: bool, yes: bool) -> None:
+def play_avf(
+    ascii_video_path: str,
+    renderer: str,
+    start: Optional[Tuple[str, float]],
+    end: Optional[Tuple[str, float]],
+    no_audio: bool,
+    stats: bool,
+    stats_format: str,
+    yes: bool
+) -> None:
+    from .stats import PipelineStats
+    
     st = time.time()
+    from rich.progress import Progress
     with Progress(transient=True) as pr:
         loading = pr.add_task("Open an archive", total=4)
         
         avfile = AVFile(ascii_video_path, "r")
+        if stats:
+            avfile.stats = PipelineStats()
         
         pr.update(loading, advance=1, description="Getting Info")
         info = avfile.get_info()
         
         pr.update(loading, advance=1, description="Getting Video")
-        frames = avfile.get_video()
+        # * Only the chunks from `first` on are read, the frames before it are skipped through the index.
+        first = 0 if (start is None) else avf_frame(start, info["fps"])
+        stop = None if (end is None) else avf_frame(end, info["fps"])
+        # * Stored text records go to the terminal straight from the mapped file.
+        runs = avfile.iter_views(first, stop) if ((avfile.encoding == "stored") and (avfile.color_mode == "none")) \
+            else avfile.iter_runs(first, stop)
         
         pr.update(loading, advance=1, description="Getting Audio")
-        if (not no_audio) and (info["exists_audio"]): audio_path = avfile.get_audio_path()
+        if (not no_audio) and (info["exists_audio"]): audio = avfile.get_audio_stream()
         
         pr.update(loading, advance=1, description="Done!")
     et = time.time()
@@ -313,6 +810,11 @@ def play_avf(ascii_video_path: str, no_audio: bool, yes: bool) -> None:
     console.print(f"\n[#EA00FF]*[/] [#BBFF00]ASCII Video File[/]: {os.path.abspath(ascii_video_path).__repr__()}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Resolution[/]: {info['res'][0]}x{info['res'][1]}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]FPS[/]: {info['fps']}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Frames[/]: {len(avfile)} ({avfile.records_count} stored)")
+    if (start is not None) or (end is not None):
+        console.print(f"[#EA00FF]*[/] [#BBFF00]Playing Frames[/]: {first}-{len(avfile) if (stop is None) else min(stop, len(avfile))}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Color Mode[/]: {avfile.color_mode}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Codec[/]: {avfile.codec.name} (level {avfile.codec.level})")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Title[/]: {info['title'].__repr__()}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Author[/]: {info['author'].__repr__()}")
     console.print(f"[#EA00FF]*[/] [#BBFF00]Exists Audio[/]: {info['exists_audio']}")
@@ -321,9 +823,165 @@ def play_avf(ascii_video_path: str, no_audio: bool, yes: bool) -> None:
     console.print(f"[#EA00FF]*[/] [#BBFF00]Total Time[/]: {round(et-st,2)} [yellow]sec[/]\n[red](ENTER to continue)[/]")
     
     if not yes: input()
-    if (not no_audio) and (info["exists_audio"]): play_audio(audio_path)
+    with_audio = (not no_audio) and info["exists_audio"]
+    if with_audio: play_audio(audio, avfile.audio_format, first / info["fps"])
+    
+    playback = play_video(runs, info['fps'], renderer, with_audio, avfile.stats)
+    avfile.close()
+    print_playback_stats(playback)
+    if stats: print_pipeline_stats(avfile.stats, stats_format, playback)
+
+# > Broadcast
+def print_client_stats(stats: "ClientStats") -> None:
+    console.print(
+        f"[#EA00FF]*[/] [#BBFF00]Client {stats.peer}[/]: {stats.sent} sent, {stats.dropped} dropped, " \
+        f"lag {round(stats.lag_avg*1000,1)} [yellow]ms[/] (max {round(stats.lag_max*1000,1)} [yellow]ms[/])"
+    )
+
+@click.command("serve", help="Broadcast an ASCII video (*.avf) or a converted video file to every client that connects over TCP (telnet, nc).")
+@click.argument(
+    "video_path",
+    type=click.Path(exists=True, file_okay=True)
+)
+@click.option(
+    "--host",
+    type=str,
+    default=DEFAULT_HOST,
+    show_default=True,
+    help="Address to listen on (0.0.0.0 for every interface)."
+)
+@click.option(
+    "--port", "-p",
+    type=click.IntRange(0, 65535),
+    default=DEFAULT_PORT,
+    show_default=True,
+    help="TCP port to listen on."
+)
+@click.option(
+    "-r", "--res",
+    type=click.Tuple([int, int]),
+    default=(120, 30),
+    show_default=True,
+    help="Resolution for conversion (ignored for *.avf)."
+)
+@click.option(
+    "--fps",
+    type=click.IntRange(1, 120),
+    default=30,
+    show_default=True,
+    help="FPS for conversion (ignored for *.avf)."
+)
+@click.option(
+    "--color", "-c",
+    type=click.Choice(COLOR_MODES),
+    default="none",
+    show_default=True,
+    help="Color mode for conversion (ignored for *.avf)."
+)
+@click.option(
+    "--decoder",
+    type=click.Choice(DECODERS),
+    default="opencv",
+    show_default=True,
+    help="Video decoder for conversion (ignored for *.avf)."
+)
+@click.option(
+    "--reducer",
+    type=click.Choice(REDUCERS),
+    default="pillow",
+    show_default=True,
+    help="Frame reduction for conversion (ignored for *.avf)."
+)
+@click.option(
+    "--cache_dir", "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory for caching the conversion, a repeated video is then converted only once."
+)
+@click.option(
+    "--loop", "-l",
+    is_flag=True,
+    help="Start the video again when it ends."
+)
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="Print the frames and the lag of every client at the end."
+)
+@click.option(
+    "--stats_format", "--stats-format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="Format of the --stats report (json is machine-readable)."
+)
+@click.option(
+    "--ascii_chars",
+    type=list,
+    default=ASCII_CHARS,
+    show_default=True,
+    help="ASCII Chars for to create gradation (256 <= ascii_chars)."
+)
+def serve(
+    video_path: str,
+    host: str,
+    port: int,
+    res: Tuple[int, int],
+    fps: int,
+    color: str,
+    decoder: str,
+    reducer: str,
+    cache_dir: Optional[str],
+    loop: bool,
+    stats: bool,
+    stats_format: str,
+    ascii_chars: List[str]
+) -> None:
+    import asyncio
+    from .batch import is_complete
+    from .cache import ConversionCache
+    from .server import BroadcastServer, RecordedSource, avf_runs, video_runs
+    
+    if len(ascii_chars) > 256: ascii_chars = ascii_chars[:256]
+    
+    if is_complete(video_path):
+        info = AVFile(video_path, "r")
+        fps, res = info.get_info()["fps"], tuple(info.get_info()["res"])
+        info.close()
+        source = lambda: avf_runs(video_path)
+    else:
+        cache = ConversionCache(cache_dir) if (cache_dir is not None) else None
+        video = avplib.AVP(video_path, ascii_chars, cache, color, decoder, reducer=reducer)
+        if fps != video.get_fps():
+            video.set_fps(fps)
+        source = lambda: video_runs(video, res)
+        # * Without a cache the video is converted on the first pass only.
+        if loop and (cache is None):
+            source = RecordedSource(source, ascii_chars, color)
+    
+    server = BroadcastServer(
+        source, fps, host, port, loop,
+        on_connect=lambda client: console.print(f"[#EA00FF]*[/] [#BBFF00]Connected[/]: {client.peer}"),
+        on_disconnect=print_client_stats
+    )
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Video Path[/]: {os.path.abspath(video_path).__repr__()}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Resolution[/]: {res[0]}x{res[1]}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]FPS[/]: {fps}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Loop[/]: {loop}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Listening[/]: {host}:{port} [yellow](telnet {host} {port})[/]")
+    
+    try:
+        asyncio.run(server.run())
+    except KeyboardInterrupt:
+        pass
     
-    play_video(frames, info['fps'])
+    report = server.stats()
+    if stats and (stats_format == "json"):
+        print(json.dumps(report, indent=4))
+    elif stats:
+        console.print(f"[#EA00FF]*[/] [#BBFF00]Late Frames[/]: {report['late']}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Published Frames[/]: {report['published']}")
+    console.print(f"[#EA00FF]*[/] [#BBFF00]Clients[/]: {len(report['clients'])}")
 
 # > Main
 @click.group()
@@ -334,5 +992,6 @@ if __name__ == '__main__':
     main.add_command(cav)
     main.add_command(convert2avf)
     main.add_command(play_avf)
+    main.add_command(serve)
     main()
     avplib.TEMP_DETECTOR.clear()
\ No newline at end of file
@@ -1,12 +1,31 @@
 import json
+import mmap
+import time
+import struct
 import pathlib
-from zipfile import ZipFile, ZIP_DEFLATED
+import numpy as np
+from io import BytesIO
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
 from tempfile import NamedTemporaryFile
-from typing import Tuple, List, Dict, Any, Literal, Union, TypeVar
+from typing import Tuple, List, Dict, Any, Literal, Union, TypeVar, Iterable, Iterator, Optional
 from .units import ASCII_CHARS
+from .stats import PipelineStats
+from .color import ColorFrame
+from .compression import Codec, DEFAULT_CODEC
 
 T = TypeVar("T")
 D = TypeVar("D")
+FRAME = Union[str, ColorFrame]
+RUN = Tuple[FRAME, int]
+
+AVF_VERSION = 3
+CHUNK_SIZE = 64
+# * Changed runs closer than this are merged into one run.
+DELTA_MERGE_GAP = 4
+KEYFRAME, DELTAFRAME = b"\x00", b"\x01"
+# * Entry of the "stored" encoding: every record uncompressed, with the same length.
+STORED_ENTRY = "video/frames"
+ENCODING = Literal["raw", "delta", "stored"]
 
 def removes(l: List[Union[T, D]], rl: List[D]) -> List[T]:
     for i in rl:
@@ -15,13 +34,217 @@ def removes(l: List[Union[T, D]], rl: List[D]) -> List[T]:
             except: pass
     return l
 
+def _varint(n: int) -> bytes:
+    data = bytearray()
+    while n >= 0x80:
+        data.append((n & 0x7F) | 0x80)
+        n >>= 7
+    data.append(n)
+    return bytes(data)
+
+def _read_varint(data: bytes, idx: int) -> Tuple[int, int]:
+    n, shift = 0, 0
+    while True:
+        byte = data[idx]
+        idx += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, idx
+        shift += 7
+
+def encode_delta(prev: bytes, frame: bytes) -> bytes:
+    """Encodes `frame` as runs `(skip, length, data)` of the bytes changed since `prev`."""
+    a, b = np.frombuffer(prev, dtype=np.uint8), np.frombuffer(frame, dtype=np.uint8)
+    changed = np.flatnonzero(a != b)
+    if len(changed) == 0:
+        return b""
+    breaks = np.flatnonzero(np.diff(changed) > DELTA_MERGE_GAP)
+    starts = changed[np.concatenate(([0], breaks + 1))].tolist()
+    ends = (changed[np.concatenate((breaks, [len(changed) - 1]))] + 1).tolist()
+    delta, position = [], 0
+    for start, end in zip(starts, ends):
+        delta.append(_varint(start - position) + _varint(end - start) + frame[start:end])
+        position = end
+    return b"".join(delta)
+
+def decode_delta(prev: bytes, delta: bytes) -> bytes:
+    frame, idx, position = bytearray(prev), 0, 0
+    while idx < len(delta):
+        skip, idx = _read_varint(delta, idx)
+        length, idx = _read_varint(delta, idx)
+        position += skip
+        frame[position:position+length] = delta[idx:idx+length]
+        position += length
+        idx += length
+    return bytes(frame)
+
+class VideoWriter:
+    """Writes frames into the chunk entries of an `AVFile` one chunk at a time.
+    
+    Only the current chunk is kept in memory, the frame index is put in the info on `close`.
+    Leaving the `with` block on an error aborts the whole file, see `AVFile.abort`.
+    A frame equal to the last written one is not stored again, the last record is shown longer instead.
+    With `encoding="stored"` the records go uncompressed into one entry instead, each text record ends with a newline."""
+    def __init__(self, avfile: "AVFile", chunk_size: int=CHUNK_SIZE, encoding: ENCODING="raw") -> None:
+        self.avfile = avfile
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.index: List[List[int]] = []
+        self.chunk: List[bytes] = []
+        self.entry = None
+        self.stride = 0
+        # * [record, repeats] of every record shown for more than one frame.
+        self.repeats: List[List[int]] = []
+        self.frames_count = 0
+        self.records_count = 0
+        self.prev: Optional[bytes] = None
+        self.closed = False
+    
+    def _repeat(self, record: int, repeats: int) -> None:
+        if (len(self.repeats) > 0) and (self.repeats[-1][0] == record):
+            self.repeats[-1][1] += repeats
+        else:
+            self.repeats.append([record, repeats + 1])
+    
+    def write_frame(self, frame: FRAME, repeats: int=1) -> None:
+        """Writes `frame` shown for `repeats` frames."""
+        if repeats <= 0:
+            return
+        if isinstance(frame, ColorFrame):
+            if self.frames_count == 0:
+                self.avfile.info.update(
+                    {"color_mode": frame.color_mode, "frame_shape": list(frame.shape), "ascii_chars": frame.ascii_chars}
+                )
+            data = frame.tobytes()
+        else:
+            data = frame.encode()
+        if self.encoding == "stored":
+            data = self._stored_record(data, isinstance(frame, ColorFrame))
+        self.frames_count += repeats
+        if data == self.prev:
+            self._repeat(self.records_count - 1, repeats)
+            return
+        if repeats > 1:
+            self._repeat(self.records_count, repeats - 1)
+        if self.encoding == "stored":
+            self.entry.write(data)
+        elif self.encoding == "delta":
+            st = time.perf_counter()
+            delta = encode_delta(self.prev, data) if ((len(self.chunk) > 0) and (len(self.prev) == len(data))) else None
+            if self.avfile.stats is not None:
+                self.avfile.stats.add("delta_encode", time.perf_counter() - st)
+            # * A frame that changed too much is cheaper to store whole.
+            if (delta is None) or (len(delta) > len(data) // 2):
+                self.chunk.append(KEYFRAME + data)
+            else:
+                self.chunk.append(DELTAFRAME + delta)
+        else:
+            self.chunk.append(data)
+        self.prev = data
+        self.records_count += 1
+        if len(self.chunk) == self.chunk_size:
+            self.flush()
+    
+    def _stored_record(self, data: bytes, color: bool) -> bytes:
+        if not color:
+            data += b"\n"
+        if self.entry is None:
+            if not color:
+                width = data.index(b"\n")
+                if len(data) % (width + 1) != 0:
+                    raise ValueError("The stored encoding needs frames of single-byte chars")
+                self.avfile.info.update({"frame_shape": [len(data) // (width + 1), width]})
+            self.stride = len(data)
+            zinfo = ZipInfo(STORED_ENTRY)
+            zinfo.compress_type = ZIP_STORED
+            self.entry = self.avfile.fp.open(zinfo, "w", force_zip64=True)
+        elif len(data) != self.stride:
+            raise ValueError(f"A frame of {len(data)} bytes in stored frames of {self.stride} bytes")
+        return data
+    
+    def write_frames(self, frames: Iterable[FRAME]) -> None:
+        for frame in frames:
+            self.write_frame(frame)
+    
+    def write_runs(self, runs: Iterable[RUN]) -> None:
+        """Writes `(frame, repeats)` pairs, see `AVFile.iter_runs`."""
+        for frame, repeats in runs:
+            self.write_frame(frame, repeats)
+    
+    def flush(self) -> None:
+        if len(self.chunk) > 0:
+            self.index.append(self.avfile._write_chunk(len(self.index), self.chunk))
+            self.chunk = []
+    
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.flush()
+        if self.entry is not None:
+            self.entry.close()
+        self.avfile.info.update(
+            {
+                "version": AVF_VERSION,
+                "encoding": self.encoding,
+                "frames_count": self.frames_count,
+                "records_count": self.records_count,
+                "repeats": self.repeats,
+                "chunk_size": self.chunk_size,
+                "index": self.index
+            }
+        )
+        if self.encoding == "stored":
+            self.avfile.info.update({"stride": self.stride})
+        self.closed = True
+    
+    def abort(self) -> None:
+        """Drops the frames written so far together with the file being written."""
+        if self.entry is not None:
+            self.entry.close()
+        self.closed = True
+        self.avfile.abort()
+    
+    def __enter__(self) -> "VideoWriter": return self
+    def __exit__(self, exc_type, *args) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
 class AVFile:
-    def __init__(self, path: str, mode: Literal["r", "w"]="r") -> None:
+    def __init__(self, path: str, mode: Literal["r", "w"]="r", codec: str=DEFAULT_CODEC, level: Optional[int]=None) -> None:
+        """`codec` (a name or a preset of `compression.PRESETS`) and `level` only apply to writing,
+        a file is read with the codec recorded in its info."""
         self.name = pathlib.Path(path)
         self.mode = mode
-        if mode == "r":     avf_args = dict(mode=self.mode)
-        elif mode == "w":   avf_args = dict(compression=ZIP_DEFLATED, compresslevel=9, mode=self.mode)
+        if mode == "w":
+            self.codec = Codec(codec, level)
+            avf_args = dict(compression=self.codec.compress_type, compresslevel=self.codec.zip_level, mode=self.mode)
+        else:
+            avf_args = dict(mode=self.mode)
         self.fp = ZipFile(path, **avf_args)
+        self.info: Dict[str, Any] = json.loads(self.fp.read("info")) if (mode == "r") else {"codec": self.codec.to_dict()}
+        if mode == "r":
+            self.codec = Codec.from_dict(self.info.get("codec"))
+        self._frames: Optional[List[str]] = None
+        self._chunk: Tuple[int, bytes] = (-1, b"")
+        self._decoded: Tuple[int, bytes] = (-1, b"")
+        self._ends: Optional[np.ndarray] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self.stats: Optional[PipelineStats] = None
+    
+    @property
+    def version(self) -> int:
+        return self.info.get("version", 1)
+    
+    @property
+    def encoding(self) -> ENCODING:
+        return self.info.get("encoding", "raw")
+    
+    @property
+    def color_mode(self) -> Literal["none", "256", "truecolor"]:
+        return self.info.get("color_mode", "none")
     
     def set_info(
         self,
@@ -32,45 +255,229 @@ class AVFile:
         exists_audio: bool=False,
         ascii_chars: List[str]=ASCII_CHARS
     ) -> None:
-        self.fp.writestr(
-            "info",
-            json.dumps(
-                {
-                    "title": title,
-                    "author": author,
-                    "fps": fps,
-                    "res": res,
-                    "exists_audio": exists_audio,
-                    "ascii_chars": ascii_chars
-                }
-            )
+        """The info is written when the file is closed, together with the frame index."""
+        self.info.update(
+            {
+                "title": title,
+                "author": author,
+                "fps": fps,
+                "res": res,
+                "exists_audio": exists_audio,
+                "ascii_chars": ascii_chars
+            }
         )
     
     def get_info(self) -> Dict[str, Any]:
-        return json.loads(self.fp.read("info"))
+        return self.info
     
-    def set_video(self, frames: List[str]=[]) -> None:
-        self.fp.writestr(
-            "video",
-            "\r\n\r\n".join(frames)
-        )
+    def set_video(
+        self,
+        frames: Iterable[FRAME]=[],
+        chunk_size: int=CHUNK_SIZE,
+        version: int=AVF_VERSION,
+        encoding: ENCODING="raw"
+    ) -> None:
+        """With `encoding="delta"` every chunk starts with a keyframe, other frames store only the changed bytes.
+        `encoding="stored"` keeps every frame uncompressed at a fixed stride, see `record_view`.
+        
+        A `ColorFrame` is stored as its char plane followed by its color plane."""
+        if version == 1:
+            self.fp.writestr("video", "\r\n\r\n".join(frames))
+            self.info.update({"version": 1})
+            return
+        with self.open_video_writer(chunk_size, encoding) as writer:
+            writer.write_frames(frames)
+    
+    def open_video_writer(self, chunk_size: int=CHUNK_SIZE, encoding: ENCODING="raw") -> "VideoWriter":
+        """Frames given to the writer are compressed into the archive as they arrive, see `VideoWriter`."""
+        return VideoWriter(self, chunk_size, encoding)
+    
+    def _write_chunk(self, chunk_idx: int, chunk: List[bytes]) -> List[int]:
+        offsets = [0]
+        for frame in chunk:
+            offsets.append(offsets[-1] + len(frame))
+        st = time.perf_counter()
+        self.fp.writestr(f"video/{chunk_idx}", self.codec.compress(b"".join(chunk)))
+        if self.stats is not None:
+            self.stats.add("compress", time.perf_counter() - st)
+        return offsets
+    
+    def _read_chunk(self, chunk_idx: int) -> bytes:
+        if self._chunk[0] != chunk_idx:
+            st = time.perf_counter()
+            self._chunk = (chunk_idx, self.codec.decompress(self.fp.read(f"video/{chunk_idx}")))
+            if self.stats is not None:
+                self.stats.add("decompress", time.perf_counter() - st)
+        return self._chunk[1]
+    
+    def _v1_frames(self) -> List[str]:
+        if self._frames is None:
+            self._frames = self.fp.read("video").decode(errors="ignore").split("\r\n\r\n")
+        return self._frames
+    
+    def __len__(self) -> int:
+        if self.version == 1:
+            return len(self._v1_frames())
+        return self.info["frames_count"]
+    
+    @property
+    def records_count(self) -> int:
+        """Number of stored frames, a record is shown for one or more frames."""
+        return self.info.get("records_count", len(self))
+    
+    def _run_ends(self) -> np.ndarray:
+        if self._ends is None:
+            repeats = np.ones(self.records_count, dtype=np.int64)
+            for record, count in self.info.get("repeats", []):
+                repeats[record] = count
+            self._ends = np.cumsum(repeats)
+        return self._ends
+    
+    def _record(self, idx: int) -> int:
+        """The record shown at the frame `idx`."""
+        if len(self.info.get("repeats", [])) == 0:
+            return idx
+        return int(np.searchsorted(self._run_ends(), idx, "right"))
+    
+    def _decode_frame(self, data: bytes) -> FRAME:
+        if self.color_mode == "none":
+            return data.decode(errors="ignore")
+        return ColorFrame.frombytes(data, tuple(self.info["frame_shape"]), self.color_mode, self.info["ascii_chars"])
     
-    def get_video(self) -> List[str]:
-        return self.fp.read("video").decode(errors="ignore").split("\r\n\r\n")
+    def get_frame(self, idx: int) -> FRAME:
+        if self.version == 1:
+            return self._v1_frames()[idx]
+        frames_count = len(self)
+        if idx < 0:
+            idx += frames_count
+        if not (0 <= idx < frames_count):
+            raise IndexError("frame index out of range")
+        return self._get_record(self._record(idx))
+    
+    def _stored_view(self) -> memoryview:
+        """The stored entry, mapped straight from the file."""
+        if self._view is None:
+            zinfo = self.fp.getinfo(STORED_ENTRY)
+            with open(self.name, "rb") as file:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            # * The data starts after the local header, its extra field can differ from the central directory.
+            name_length, extra_length = struct.unpack("<HH", self._mmap[zinfo.header_offset+26:zinfo.header_offset+30])
+            offset = zinfo.header_offset + 30 + name_length + extra_length
+            self._view = memoryview(self._mmap)[offset:offset+zinfo.file_size]
+        return self._view
+    
+    def record_view(self, idx: int) -> memoryview:
+        """The record `idx` of a file with the stored encoding, without copying it.
+        
+        A text record is a (height, width + 1) `memoryview` of its rows with their newlines,
+        a colored record is its char plane followed by its color plane."""
+        stride = self.info["stride"]
+        view = self._stored_view()[idx*stride:(idx+1)*stride]
+        if self.color_mode != "none":
+            return view
+        height, width = self.info["frame_shape"]
+        return view.cast("B", (height, width + 1))
+    
+    def _get_record(self, idx: int) -> FRAME:
+        if self.encoding == "stored":
+            view = self.record_view(idx)
+            if self.color_mode == "none":
+                return view.tobytes()[:-1].decode()
+            return self._decode_frame(view)
+        chunk_idx, frame_idx = divmod(idx, self.info["chunk_size"])
+        offsets = self.info["index"][chunk_idx]
+        chunk = self._read_chunk(chunk_idx)
+        if self.encoding != "delta":
+            return self._decode_frame(chunk[offsets[frame_idx]:offsets[frame_idx+1]])
+        # * Continue from the last decoded frame when it is in the same chunk.
+        last_idx, data = self._decoded
+        if (last_idx // self.info["chunk_size"] != chunk_idx) or (last_idx > idx) or (last_idx < 0):
+            last_idx, data = idx - frame_idx - 1, b""
+        st = time.perf_counter()
+        for i in range(last_idx + 1 - chunk_idx * self.info["chunk_size"], frame_idx + 1):
+            record = chunk[offsets[i]:offsets[i+1]]
+            data = record[1:] if (record[:1] == KEYFRAME) else decode_delta(data, record[1:])
+        if self.stats is not None:
+            self.stats.add("delta_decode", time.perf_counter() - st)
+        self._decoded = (idx, data)
+        return self._decode_frame(data)
+    
+    def _iter_records(self, start: int, stop: int) -> Iterator[Tuple[int, int]]:
+        position, record = start, self._record(start)
+        ends = self._run_ends()
+        while position < stop:
+            end = min(int(ends[record]), stop)
+            yield record, end - position
+            position, record = end, record + 1
+    
+    def iter_runs(self, start: int=0, stop: Optional[int]=None) -> Iterator[RUN]:
+        """Every record from the frame `start` to `stop` once, with the number of frames it is shown for."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if self.version == 1:
+            for frame in self._v1_frames()[start:stop]:
+                yield frame, 1
+            return
+        for record, repeats in self._iter_records(start, stop):
+            yield self._get_record(record), repeats
+    
+    def iter_views(self, start: int=0, stop: Optional[int]=None) -> Iterator[Tuple[memoryview, int]]:
+        """Like `iter_runs` with the records of `record_view`, for files with the stored encoding."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        for record, repeats in self._iter_records(start, stop):
+            yield self.record_view(record), repeats
+    
+    def iter_frames(self, start: int=0, stop: Optional[int]=None) -> Iterator[FRAME]:
+        for frame, repeats in self.iter_runs(start, stop):
+            for i in range(repeats):
+                yield frame
+    
+    def get_video(self) -> List[FRAME]:
+        return list(self.iter_frames())
+    
+    @property
+    def audio_format(self) -> str:
+        """Files without `audio_format` in the info contain the MP3 written by MoviePy."""
+        return self.info.get("audio_format", "mp3")
     
     def set_audio_from_path(self, audio_path: str) -> None:
         self.fp.write(audio_path, "audio")
+        self.info.update({"audio_format": pathlib.Path(audio_path).suffix[1:].lower() or "mp3"})
     
     def get_audio_path(self) -> str:
         with NamedTemporaryFile(delete=False) as audio_file:
             audio_file.write(self.fp.read("audio"))
         return audio_file.name
     
-    def set_audio_from_bytes(self, audio: bytes) -> None:
-        self.fp.writestr("audio", audio)
+    def set_audio_from_bytes(self, audio: bytes, audio_format: str="wav") -> None:
+        # * Compressed audio does not shrink any further, it is stored as is.
+        compress_type = ZIP_DEFLATED if (audio_format == "wav") else ZIP_STORED
+        self.fp.writestr("audio", audio, compress_type=compress_type)
+        self.info.update({"audio_format": audio_format})
     
     def get_audio_bytes(self) -> bytes:
         return self.fp.read("audio")
     
+    def get_audio_stream(self) -> BytesIO:
+        return BytesIO(self.fp.read("audio"))
+    
+    def abort(self) -> None:
+        """Closes a file being written without its info and removes it, a file being read is only closed."""
+        if self.mode != "w":
+            return self.close()
+        try:
+            self.fp.close()
+        finally:
+            self.name.unlink(missing_ok=True)
+    
     def close(self) -> None:
-        self.fp.close()
\ No newline at end of file
+        if (self.mode == "w") and (self.fp.fp is not None):
+            self.fp.writestr("info", json.dumps(self.info))
+        self.fp.close()
+        if self._mmap is not None:
+            self._view.release()
+            try:
+                self._mmap.close()
+            except BufferError:
+                # * Records handed out still point into the mapping, it is unmapped with the last of them.
+                pass
+            self._mmap, self._view = None, None
\ No newline at end of file
@@ -1,40 +1,50 @@
 import os
 import cv2
+import numpy as np
+import math
+import functools
 import time
 import queue
-import moviepy.editor as mp
-import soundfile as sf
-from PIL import Image
+from contextlib import nullcontext
 from io import BufferedReader, BytesIO
 from tempfile import NamedTemporaryFile
-from threading import Thread
+from threading import Thread, Event, Condition, BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
 try: 
-    from multiprocessing import Process, Pipe
-    from multiprocessing.connection import PipeConnection
+    from multiprocessing import Process, Pipe, get_context
+    try:
+        from multiprocessing.connection import PipeConnection
+    except ImportError:
+        from multiprocessing.connection import Connection as PipeConnection
     init_multiprocessing = True
 except:
     init_multiprocessing = False
 # > Typing
-from typing import Literal, Any, Optional, Union, TypeVar, Generic, Tuple, List
+from typing import Literal, Any, Optional, Union, TypeVar, Generic, Tuple, List, Dict, Iterator, Iterable, Callable
 # > Local Imports
-from .units import ASCII_CHARS_GRADIENTION, ASCII_CHARS
+from .units import ASCII_CHARS_GRADIENTION, ASCII_CHARS, AUDIO_FORMATS
+from .engine import (
+    ASCII_LUT, REDUCER, generate_ascii_lut, reduce_frame, map_ascii_frame, join_ascii_frame, render_ascii_frame,
+    index_frame, convert_color_frame, shrink_frame, color_frame, frame_digest
+)
+from .color import PaletteLUT, ColorLUT, ColorFrame
+from .store import FrameStore
+from .decoder import DECODER, find_ffmpeg, open_capture
+from .temp import TempDetected, TEMP_DETECTOR
+from .cache import ConversionCache
+from .gray import GrayCache, GrayFrames, GrayLUT
+from .stats import PipelineStats
 
 # ! Types
 DT = TypeVar('DT')
 PDT = TypeVar('PDT')
-
-# ! Temp Detected
-class TempDetected:
-    def __init__(self) -> None:
-        self.files = []
-    def append(self, path: str) -> None: self.files.append(path)
-    def clear(self) -> None:
-        for i in self.files:
-            try: os.remove(i)
-            except: pass
-
-# > Initilation
-TEMP_DETECTOR = TempDetected()
+FRAME_LUT = Union[ASCII_LUT, PaletteLUT]
+# * Palette indices (`np.ndarray`) come out of a `PaletteLUT` and go into a `FrameStore`.
+FRAME = Union[str, ColorFrame, np.ndarray]
+# * A frame and the number of frames it is shown for.
+RUN = Tuple[FRAME, int]
+# * A place in a video: a frame index or a time in seconds.
+POSITION = Tuple[Literal["frame", "time"], float]
 
 # > Functions
 def _callback(complited: int, total: int): ...
@@ -43,9 +53,184 @@ def generate_ascii_chars_gradient(ascii_chars: List[str]=ASCII_CHARS) -> List[st
     ascii_chars_gradient_k = int(256 / len(ascii_chars)) + 1
     return [ascii_chars[i // ascii_chars_gradient_k] for i in range(0, 257)]
 
-def generate_ascii_frame(image_frame, frame_size: Tuple[int, int], ascii_chars_gradient: List[str]=ASCII_CHARS_GRADIENTION) -> str:
-    ac = "".join([ascii_chars_gradient[pixel] for pixel in Image.fromarray(image_frame).convert("L").resize(frame_size).getdata()])
-    return "\n".join([ac[index:(index+frame_size[0])] for index in range(0, len(ac), frame_size[0])])
+def generate_ascii_frame(
+    image_frame,
+    frame_size: Tuple[int, int],
+    ascii_chars_gradient: List[str]=ASCII_CHARS_GRADIENTION,
+    ascii_lut: Optional[ASCII_LUT]=None
+) -> str:
+    if ascii_lut is None:
+        ascii_lut = generate_ascii_lut(ascii_chars_gradient)
+    return render_ascii_frame(reduce_frame(image_frame, frame_size), ascii_lut)
+
+def expand_runs(runs: Iterable[RUN]) -> Iterator[FRAME]:
+    try:
+        for frame, repeats in runs:
+            for i in range(repeats):
+                yield frame
+    finally:
+        if hasattr(runs, "close"):
+            runs.close()
+
+def _measure(stats: Optional[PipelineStats], stage: str):
+    return nullcontext() if (stats is None) else stats.measure(stage)
+
+def read_frame(capture, stats: Optional[PipelineStats]=None) -> Tuple[bool, Any]:
+    if stats is None:
+        return capture.read()
+    st = time.perf_counter()
+    data = capture.read()
+    stats.add("decode", time.perf_counter() - st)
+    return data
+
+def convert_frame(
+    image_frame,
+    frame_size: Tuple[int, int],
+    ascii_lut: FRAME_LUT,
+    stats: Optional[PipelineStats]=None,
+    reducer: REDUCER="pillow"
+) -> FRAME:
+    if isinstance(ascii_lut, ColorLUT):
+        if stats is None:
+            return convert_color_frame(image_frame, frame_size, ascii_lut, reducer)
+        with stats.measure("map"):
+            return convert_color_frame(image_frame, frame_size, ascii_lut, reducer)
+    if isinstance(ascii_lut, PaletteLUT):
+        if stats is None:
+            return index_frame(image_frame, frame_size, ascii_lut.index_lut, reducer)
+        with stats.measure("map"):
+            return index_frame(image_frame, frame_size, ascii_lut.index_lut, reducer)
+    if stats is None:
+        return render_ascii_frame(reduce_frame(image_frame, frame_size, reducer), ascii_lut)
+    st = time.perf_counter()
+    gray_frame = reduce_frame(image_frame, frame_size, reducer)
+    reduced = time.perf_counter()
+    mapped_frame = map_ascii_frame(gray_frame, ascii_lut)
+    mapped = time.perf_counter()
+    text_frame = join_ascii_frame(mapped_frame)
+    stats.add("reduce", reduced - st)
+    stats.add("map", mapped - reduced)
+    stats.add("join", time.perf_counter() - mapped)
+    return text_frame
+
+def reduce_planes(
+    image_frame,
+    frame_size: Tuple[int, int],
+    ascii_lut: FRAME_LUT,
+    reducer: REDUCER="pillow"
+) -> Tuple[np.ndarray, ...]:
+    """The reduced frame the chars (and the colors) are made from, equal planes give equal frames."""
+    gray_frame = reduce_frame(image_frame, frame_size, reducer)
+    if isinstance(ascii_lut, ColorLUT):
+        return gray_frame, shrink_frame(image_frame, frame_size)
+    return (gray_frame,)
+
+def map_planes(planes: Tuple[np.ndarray, ...], ascii_lut: FRAME_LUT) -> FRAME:
+    if isinstance(ascii_lut, ColorLUT):
+        return color_frame(planes[0], planes[1], ascii_lut)
+    if isinstance(ascii_lut, PaletteLUT):
+        return np.take(ascii_lut.index_lut, planes[0])
+    return render_ascii_frame(planes[0], ascii_lut)
+
+def same_frame(a: FRAME, b: FRAME) -> bool:
+    if isinstance(a, ColorFrame) and isinstance(b, ColorFrame):
+        return np.array_equal(a.chars, b.chars) and np.array_equal(a.colors, b.colors)
+    if isinstance(a, np.ndarray) and isinstance(b, np.ndarray):
+        return np.array_equal(a, b)
+    return (type(a) is type(b)) and (a == b)
+
+def frame_repeats(idx: int, source_fps: float, fps: Optional[float]=None) -> int:
+    """How many frames at `fps` show the source frame `idx`, `0` means that the frame is skipped."""
+    if (fps is None) or (fps == source_fps):
+        return 1
+    ratio = fps / source_fps
+    return math.ceil((idx + 1) * ratio - 1e-9) - math.ceil(idx * ratio - 1e-9)
+
+def iter_frame_runs(
+    capture,
+    start: int,
+    stop: int,
+    frame_size: Tuple[int, int],
+    ascii_lut: FRAME_LUT,
+    source_fps: float,
+    fps: Optional[float]=None,
+    stats: Optional[PipelineStats]=None,
+    progress: Optional[Callable[[int], None]]=None,
+    sink: Optional[Callable[[np.ndarray, int], None]]=None,
+    reducer: REDUCER="pillow"
+) -> Iterator[RUN]:
+    """Converts the frames `start`..`stop` of `capture` into `(frame, repeats)` runs.
+    
+    A frame equal to the one before it is recognized by the digest of its reduced planes,
+    before its chars are made, and only extends the run. `sink` gets every reduced grayscale frame."""
+    frame, repeats, digest = None, 0, None
+    for i in range(start, stop):
+        if progress is not None:
+            progress(i)
+        count = frame_repeats(i, source_fps, fps)
+        if count == 0:
+            if not capture.grab():
+                break
+            continue
+        ret, image_frame = read_frame(capture, stats)
+        if not ret:
+            break
+        with _measure(stats, "reduce"):
+            planes = reduce_planes(image_frame, frame_size, ascii_lut, reducer)
+        if sink is not None:
+            sink(planes[0], count)
+        with _measure(stats, "hash"):
+            frame_key = frame_digest(*planes)
+        if frame_key == digest:
+            repeats += count
+            continue
+        digest = frame_key
+        with _measure(stats, "map"):
+            mapped = map_planes(planes, ascii_lut)
+        # * Slightly different planes (noise of a lossy codec) can still give the same chars.
+        if (frame is not None) and same_frame(frame, mapped):
+            repeats += count
+            continue
+        if frame is not None:
+            yield frame, repeats
+        frame, repeats = mapped, count
+    if frame is not None:
+        yield frame, repeats
+
+def _convert_segment(
+    args: Tuple[str, int, int, Tuple[int, int], FRAME_LUT, float, Optional[float], bool, DECODER, REDUCER]
+) -> Tuple[List[RUN], Optional[Dict[str, Any]]]:
+    path, start, stop, frame_size, ascii_lut, source_fps, fps, collect_stats, decoder, reducer = args
+    stats = PipelineStats() if collect_stats else None
+    capture = open_capture(path, frame_size, start, decoder, isinstance(ascii_lut, ColorLUT))
+    try:
+        runs = list(iter_frame_runs(capture, start, stop, frame_size, ascii_lut, source_fps, fps, stats, reducer=reducer))
+    finally:
+        capture.release()
+    return runs, (stats.to_dict()["stages"] if (stats is not None) else None)
+
+def split_segments(start: int, stop: int, count: int, min_size: int=32) -> List[Tuple[int, int]]:
+    size = max(-(-(stop - start) // max(count, 1)), min_size)
+    return [(i, min(i + size, stop)) for i in range(start, stop, size)]
+
+def _cached(method):
+    """Frames of `method` are read from `AVP.cache` when they are there, and written to it otherwise.
+    
+    With `AVP.gray_cache` they are mapped from its grayscale frames. Missing ones are made by `method` itself,
+    so the threading, multiprocessing and segmented modes fill the grayscale cache too, see `AVP._fill_gray`."""
+    @functools.wraps(method)
+    def wrapper(self: "AVP", frame_size, *args, **kwargs):
+        frames = self.read_cache(frame_size)
+        if frames is None:
+            frames = self.read_gray(frame_size)
+        if frames is None:
+            if self.uses_gray_cache:
+                frames = self._fill_gray(frame_size, method, *args, **kwargs)
+            else:
+                frames = method(self, frame_size, *args, **kwargs)
+            self.write_cache(frame_size, frames)
+        return frames
+    return wrapper
 
 # > Classes
 class ProgressiveList(Generic[DT, PDT]):
@@ -87,31 +272,193 @@ class ProgressiveList(Generic[DT, PDT]):
                 datas.append(i)
         return datas
 
+class AsciiFramesStream:
+    """Converts frames on a background thread into a bounded buffer of `prefetch` frames."""
+    _END = object()
+    
+    def __init__(self, frames: Iterator[str], prefetch: int=64, stats: Optional[PipelineStats]=None) -> None:
+        assert isinstance(prefetch, int) and (prefetch > 0)
+        self.prefetch = prefetch
+        self.stats = stats
+        self.queue: queue.Queue[Any] = queue.Queue(prefetch)
+        self.buffering = Condition()
+        self.finished = Event()
+        self.stopped = Event()
+        self.exhausted = False
+        self.error: Optional[BaseException] = None
+        self.thread = Thread(target=self._producer, args=(frames,), daemon=True)
+        self.thread.start()
+    
+    def _put(self, item: Any) -> bool:
+        st = time.perf_counter()
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            if self.stats is not None:
+                self.stats.add("queue_wait", time.perf_counter() - st)
+            with self.buffering:
+                self.buffering.notify_all()
+            return True
+        return False
+    
+    def _producer(self, frames: Iterator[str]) -> None:
+        try:
+            for frame in frames:
+                if not self._put(frame):
+                    break
+        except BaseException as e:
+            self.error = e
+        finally:
+            if hasattr(frames, "close"):
+                frames.close()
+            self.finished.set()
+            self._put(self._END)
+            with self.buffering:
+                self.buffering.notify_all()
+    
+    @property
+    def buffered(self) -> int:
+        return self.queue.qsize()
+    
+    def wait(self, low_water: int, timeout: Optional[float]=None) -> bool:
+        """Blocks until `low_water` frames are buffered or the conversion is finished."""
+        low_water = min(low_water, self.prefetch)
+        with self.buffering:
+            return self.buffering.wait_for(
+                lambda: self.finished.is_set() or (self.queue.qsize() >= low_water),
+                timeout
+            )
+    
+    def __iter__(self) -> "AsciiFramesStream": return self
+    
+    def __next__(self) -> str:
+        if self.exhausted:
+            raise StopIteration
+        frame = self.queue.get()
+        if frame is self._END:
+            self.exhausted = True
+            if self.error is not None:
+                raise self.error
+            raise StopIteration
+        return frame
+    
+    def close(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+    
+    def __enter__(self) -> "AsciiFramesStream": return self
+    def __exit__(self, *args) -> None: self.close()
+
 # ! Handlers
+class RunCollector:
+    """Puts reduced frames, given in order, into `(frame, repeats)` runs as `iter_frame_runs` does.
+
+    A frame with the digest of the one before it only extends the run, its chars are not made."""
+    def __init__(self, ascii_lut: FRAME_LUT, stats: Optional[PipelineStats]=None) -> None:
+        self.ascii_lut = ascii_lut
+        self.stats = stats
+        self.runs: List[RUN] = []
+        self.digest: Optional[bytes] = None
+    
+    def add(self, planes: Tuple[np.ndarray, ...], frame_key: bytes, repeats: int=1) -> None:
+        if frame_key != self.digest:
+            self.digest = frame_key
+            with _measure(self.stats, "map"):
+                mapped = map_planes(planes, self.ascii_lut)
+            if (len(self.runs) == 0) or not same_frame(self.runs[-1][0], mapped):
+                self.runs.append((mapped, repeats))
+                return
+        frame, count = self.runs[-1]
+        self.runs[-1] = (frame, count + repeats)
+
 class ThreadingFrameHandler:
+    """Reduces and hashes frames on a fixed pool of `workers` threads.
+    
+    `get_acsii_frame` blocks while `max_in_flight` frames are being converted, the reduced frames
+    are put back in order through a small reorder buffer and only the changed ones are mapped."""
     def __init__(
         self,
         frames_count: int,
         frame_size: Tuple[int, int],
         callback=_callback,
-        ascii_chars_gradient: List[str]=ASCII_CHARS_GRADIENTION
+        ascii_chars_gradient: List[str]=ASCII_CHARS_GRADIENTION,
+        workers: Optional[int]=None,
+        max_in_flight: Optional[int]=None,
+        stats: Optional[PipelineStats]=None,
+        ascii_lut: Optional[FRAME_LUT]=None,
+        reducer: REDUCER="pillow"
     ) -> None:
         self.frames_count = frames_count
+        self.stats = stats
         self.frame_size = frame_size
-        self.pl: ProgressiveList[str, None] = ProgressiveList(frames_count)
+        self.reducer = reducer
         self.done = 1
         self.callback = callback
         self.ascii_chars_gradient = ascii_chars_gradient
+        self.ascii_lut = generate_ascii_lut(ascii_chars_gradient) if (ascii_lut is None) else ascii_lut
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or (self.workers * 4)
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.in_flight = BoundedSemaphore(self.max_in_flight)
+        self.finished = Condition()
+        self.reorder: Dict[int, Tuple[Optional[Tuple[np.ndarray, ...]], Optional[bytes], int]] = {}
+        self.next_idx: Optional[int] = None
+        self.collector = RunCollector(self.ascii_lut, stats)
+        self.submitted = 0
+        self.completed = 0
+        self.error: Optional[BaseException] = None
     
-    def _gaf(self, idx: int, data: Tuple[bool, Any]) -> None:
+    def _gaf(self, idx: int, data: Tuple[bool, Any], repeats: int=1) -> None:
         ret, image_frame = data
-        if ret:
-            self.pl[idx] = generate_ascii_frame(image_frame, self.frame_size, self.ascii_chars_gradient)
-        self.done += 1
-        self.callback(self.done, self.frames_count)
+        planes, frame_key = None, None
+        try:
+            if ret:
+                with _measure(self.stats, "reduce"):
+                    planes = reduce_planes(image_frame, self.frame_size, self.ascii_lut, self.reducer)
+                with _measure(self.stats, "hash"):
+                    frame_key = frame_digest(*planes)
+        except BaseException as e:
+            planes, self.error = None, e
+        with self.finished:
+            self.reorder[idx] = (planes, frame_key, repeats)
+            while self.next_idx in self.reorder:
+                planes, frame_key, repeats = self.reorder.pop(self.next_idx)
+                try:
+                    if planes is not None:
+                        self.collector.add(planes, frame_key, repeats)
+                except BaseException as e:
+                    self.error = e
+                self.next_idx += 1
+                # * The planes can be views of a reused capture buffer, it is read again once they are mapped.
+                self.in_flight.release()
+            self.completed += 1
+            self.done += 1
+            self.callback(self.done, self.frames_count)
+            self.finished.notify_all()
+    
+    def get_acsii_frame(self, idx: int, data: Tuple[bool, Any], repeats: int=1) -> None:
+        """`idx` must grow by one with every call, the frame is kept once with its `repeats`."""
+        if self.stats is None:
+            self.in_flight.acquire()
+        else:
+            with self.stats.measure("queue_wait"):
+                self.in_flight.acquire()
+        with self.finished:
+            if self.next_idx is None:
+                self.next_idx = idx
+            self.submitted += 1
+        self.executor.submit(self._gaf, idx, data, repeats)
     
-    def get_acsii_frame(self, idx: int, data: Tuple[bool, Any]) -> None:
-        Thread(target=self._gaf, args=(idx, data)).start()
+    def join(self) -> List[RUN]:
+        """Waits for all submitted frames and returns them in order, as `(frame, repeats)` runs."""
+        with self.finished:
+            self.finished.wait_for(lambda: self.completed >= self.submitted)
+        self.executor.shutdown()
+        if self.error is not None:
+            raise self.error
+        return self.collector.runs
 
 if init_multiprocessing:
     class MultiprocessingFrameHandler:
@@ -119,12 +466,20 @@ if init_multiprocessing:
             self,
             frames_count: int,
             frame_size: Tuple[int, int],
-            callback=_callback
+            callback=_callback,
+            ascii_chars_gradient: List[str]=ASCII_CHARS_GRADIENTION,
+            stats: Optional[PipelineStats]=None,
+            ascii_lut: Optional[FRAME_LUT]=None,
+            reducer: REDUCER="pillow"
         ) -> None:
             self.frames_count = frames_count
             self.frame_size = frame_size
+            self.reducer = reducer
+            self.stats = stats
+            self.ascii_lut = generate_ascii_lut(ascii_chars_gradient) if (ascii_lut is None) else ascii_lut
             self.queue: queue.Queue[Tuple[int, bool, Any]] = queue.Queue()
-            self.pl: ProgressiveList[str, None] = ProgressiveList(frames_count)
+            # * The reduced planes of every frame and their digest, the frames are mapped in order by `runs`.
+            self.pl: ProgressiveList[Tuple[Tuple[np.ndarray, ...], bytes], None] = ProgressiveList(frames_count)
             self.done = 1
             self.callback = callback
             self.cores = os.cpu_count() or 1
@@ -132,25 +487,27 @@ if init_multiprocessing:
         
         @staticmethod
         def _gaf(connection: PipeConnection) -> None:
-            frame_size: Tuple[int, int] = connection.recv()
+            frame_size, ascii_lut, reducer = connection.recv()
             while True:
                 data: Union[Tuple[int, bool, Any], Literal[0]] = connection.recv()
                 if data == 0:
                     break
                 idx, ret, image_frame = data
                 if ret:
-                    ac = "".join([ASCII_CHARS_GRADIENTION[pixel] for pixel in Image.fromarray(image_frame).convert("L").resize(frame_size).getdata()])
-                    text_frame = "\n".join([ac[index:(index+frame_size[0])] for index in range(0, len(ac), frame_size[0])])
+                    planes = reduce_planes(image_frame, frame_size, ascii_lut, reducer)
+                    connection.send((idx, (planes, frame_digest(*planes))))
                 else:
-                    text_frame = None
-                connection.send((idx, text_frame))
+                    connection.send((idx, None))
         
         def _gaf_control_thread(self, pipe: PipeConnection) -> None:
             self.processes_started += 1
-            pipe.send(self.frame_size)
+            pipe.send((self.frame_size, self.ascii_lut, self.reducer))
             while not self.queue.empty():
+                st = time.perf_counter()
                 pipe.send(self.queue.get())
-                data: Tuple[int, Optional[str]] = pipe.recv()
+                data: Tuple[int, Optional[Tuple[Tuple[np.ndarray, ...], bytes]]] = pipe.recv()
+                if self.stats is not None:
+                    self.stats.add("ipc", time.perf_counter() - st)
                 if data[1] is not None:
                     self.pl[data[0]] = data[1]
                 self.done += 1
@@ -158,6 +515,14 @@ if init_multiprocessing:
             pipe.send(0)
             self.processes_started -= 1
         
+        def runs(self, repeats: Dict[int, int]) -> List[RUN]:
+            """The converted frames in order as `(frame, repeats)` runs, `repeats` of every slot."""
+            collector = RunCollector(self.ascii_lut, self.stats)
+            for i in repeats:
+                if self.pl[i] is not None:
+                    collector.add(*self.pl[i], repeats[i])
+            return collector.runs
+        
         def add_task_data(self, idx: int, ret: bool, image_frame: Any) -> None:
             self.queue.put((idx, ret, image_frame))
         
@@ -171,8 +536,28 @@ if init_multiprocessing:
 
 # ! Main Class
 class AVP:
-    def __init__(self, fp, ascii_chars: List[str]=ASCII_CHARS) -> None:
+    def __init__(
+        self,
+        fp,
+        ascii_chars: List[str]=ASCII_CHARS,
+        cache: Optional[ConversionCache]=None,
+        color_mode: Literal["none", "256", "truecolor"]="none",
+        decoder: DECODER="opencv",
+        gray_cache: Optional[GrayCache]=None,
+        reducer: REDUCER="pillow"
+    ) -> None:
+        self.ascii_chars = ascii_chars
+        self.cache = cache
+        self.gray_cache = gray_cache
+        self.color_mode = color_mode
+        # * Without an ffmpeg binary the frames are decoded by OpenCV.
+        self.decoder: DECODER = decoder if ((decoder != "ffmpeg") or (find_ffmpeg() is not None)) else "opencv"
+        self.reducer: REDUCER = reducer
+        self.stats: Optional[PipelineStats] = None
         self.ascii_chars_gradient = generate_ascii_chars_gradient(ascii_chars)
+        self.ascii_lut: FRAME_LUT = generate_ascii_lut(self.ascii_chars_gradient) \
+            if (color_mode == "none") else ColorLUT(ascii_chars, color_mode)
+        self.palette_lut: PaletteLUT = self.ascii_lut if (color_mode != "none") else PaletteLUT(ascii_chars)
         if isinstance(fp, str):
             self.path = os.path.abspath(fp)
         elif isinstance(fp, bytes):
@@ -184,7 +569,19 @@ class AVP:
             self.path = os.path.abspath(fp.name)
         else:
             raise TypeError(f"The variable type 'fp' does not accept the type {type(fp)}")
-        self.video = mp.VideoFileClip(self.path)
+        self._video = None
+        self.fps: Optional[int] = None
+        self.source_fps: Optional[float] = None
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+    
+    @property
+    def video(self):
+        """The MoviePy clip is only created when it is needed (audio), it probes the file through ffmpeg."""
+        if self._video is None:
+            from moviepy.video.io.VideoFileClip import VideoFileClip
+            self._video = VideoFileClip(self.path)
+        return self._video
     
     def get_frames_count(self):
         cap = cv2.VideoCapture(self.path)
@@ -192,16 +589,76 @@ class AVP:
         cap.release()
         return total_frames
     
+    def get_source_fps(self) -> float:
+        if self.source_fps is None:
+            cap = cv2.VideoCapture(self.path)
+            self.source_fps = cap.get(cv2.CAP_PROP_FPS) or self.video.fps
+            cap.release()
+        return self.source_fps
+    
     def get_fps(self):
-        return int(self.video.fps)
+        return self.fps or int(self.get_source_fps())
     
     def set_fps(self, fps):
-        with NamedTemporaryFile("wb", suffix=".mp4", delete=False) as tempfile:
-            filepath = os.path.abspath(tempfile.name)
-            TEMP_DETECTOR.append(filepath)
-        self.video.write_videofile(filename=filepath, fps=fps, codec="mpeg4")
+        """Frames are picked or repeated while decoding to hit `fps`, the video is not re-encoded."""
+        self.fps = fps
+    
+    def set_bounds(self, start: Union[int, POSITION, None]=None, end: Union[int, POSITION, None]=None):
+        """Only the source frames from `start` up to `end` (excluded) are converted, the decoder seeks straight to `start`."""
+        self.start, self.end = [
+            bound if ((bound is None) or isinstance(bound, int)) else self.position_frame(bound) for bound in (start, end)
+        ]
+    
+    def frame_at(self, seconds: float) -> int:
+        """The source frame shown `seconds` into the playback of the whole video."""
+        return round(seconds * self.get_source_fps()) + 1
+    
+    def position_frame(self, position: POSITION) -> int:
+        unit, value = position
+        return int(value) if (unit == "frame") else self.frame_at(value)
+    
+    def get_bounds(self) -> Tuple[int, int]:
+        """The source frames `start`..`stop` that are converted."""
+        frames_count = self.get_frames_count()
+        start = max(self.start or 1, 1)
+        stop = frames_count if (self.end is None) else min(self.end, frames_count)
+        return start, max(start, stop)
+    
+    def _bounds_key(self) -> Optional[Tuple[int, int]]:
+        return None if ((self.start is None) and (self.end is None)) else self.get_bounds()
+    
+    def open_capture(self, frame_size, start: int=1, buffers: Optional[int]=1):
+        """A capture of the video at the frame `start` for `self.decoder`, see `decoder.open_capture`."""
+        return open_capture(self.path, frame_size, start, self.decoder, self.color_mode != "none", buffers)
+    
+    def _frame_repeats(self, idx: int) -> int:
+        return frame_repeats(idx, self.get_source_fps(), self.fps)
+    
+    @property
+    def audio(self):
+        """The audio clip of the video, cut to the bounds of `set_bounds`."""
+        audio = self.video.audio
+        if (audio is None) or (self._bounds_key() is None):
+            return audio
+        start, stop = self.get_bounds()
+        source_fps = self.get_source_fps()
+        return audio.subclip((start - 1) / source_fps, min((stop - 1) / source_fps, audio.duration))
+    
+    def get_audio_stream(self, audio_format: Literal["wav", "flac", "ogg"]="ogg", fps: int=44100) -> BytesIO:
+        """Encodes the audio track in memory, the decoded samples are processed one second at a time."""
+        import soundfile as sf
+        file_format, subtype, nbytes = AUDIO_FORMATS[audio_format]
+        st = time.perf_counter()
+        audio, bio = self.audio, BytesIO()
+        with sf.SoundFile(bio, "w", fps, audio.nchannels, subtype, format=file_format) as sound_file:
+            for chunk in audio.iter_chunks(chunksize=fps, fps=fps, quantize=True, nbytes=nbytes):
+                sound_file.write(chunk)
+        bio.seek(0)
+        if self.stats is not None:
+            self.stats.add("audio", time.perf_counter() - st)
+        return bio
     
-    def get_audio(self, tp: Literal["file", "bytes", "array"], filepath=None):
+    def get_audio(self, tp: Literal["file", "bytes", "array", "stream"], filepath=None, audio_format="wav"):
         if tp == "file":
             if filepath is None:
                 with NamedTemporaryFile("wb", suffix=".mp3", delete=False) as tempfile:
@@ -209,51 +666,238 @@ class AVP:
                     TEMP_DETECTOR.append(filepath)
             else:
                 filepath = os.path.abspath(filepath)
-            self.video.audio.write_audiofile(filepath)
+            self.audio.write_audiofile(filepath)
             return filepath
-        elif (tp == "bytes") or (tp == "array"):
-            array = self.video.audio.to_soundarray(fps=44100, nbytes=4)
-            if tp == "array":
-                return array
-            else:
-                bio = BytesIO()
-                sf.write(bio, array, 44100, subtype="PCM_32", format="WAV")
-                return bio.read()
+        elif tp == "array":
+            return self.audio.to_soundarray(fps=44100, nbytes=4)
+        elif tp == "bytes":
+            return self.get_audio_stream(audio_format).getvalue()
+        elif tp == "stream":
+            return self.get_audio_stream(audio_format)
 
-    def get_ascii_frames(self, frame_size, callback=_callback):
-        capture, al = cv2.VideoCapture(self.path), []
-        capture.set(1, 1)
-        frames_count = self.get_frames_count()
-        for i in range(1, frames_count):
-            callback(i, frames_count)
-            ret, image_frame = capture.read()
-            if ret:
-                al.append(generate_ascii_frame(image_frame, frame_size, self.ascii_chars_gradient))
+    def cache_key(self, frame_size) -> str:
+        return ConversionCache.key(
+            self.path, frame_size, self.ascii_chars, self.fps or self.get_source_fps(), self.color_mode, self.decoder,
+            self.reducer, self._bounds_key()
+        )
+    
+    def get_cached(self, frame_size):
+        if self.cache is None:
+            return None
+        avfile = self.cache.get(self.cache_key(frame_size))
+        if avfile is not None:
+            avfile.stats = self.stats
+        return avfile
+    
+    def read_cache(self, frame_size):
+        avfile = self.get_cached(frame_size)
+        if avfile is None:
+            return None
+        try:
+            return FrameStore.from_runs(avfile.iter_runs(), self.ascii_chars, self.color_mode)
+        finally:
+            avfile.close()
+    
+    def write_cache(self, frame_size, frames) -> None:
+        if (self.cache is not None) and (len(frames) > 0):
+            self.cache.put(self.cache_key(frame_size), frames.runs(), self.get_fps(), frame_size, self.ascii_chars)
+    
+    @staticmethod
+    def _iter_cached(avfile):
+        try:
+            yield from avfile.iter_runs()
+        finally:
+            avfile.close()
+    
+    @property
+    def uses_gray_cache(self) -> bool:
+        """Colored frames need more than the grayscale plane, they are always converted from the video."""
+        return (self.gray_cache is not None) and (self.color_mode == "none")
+    
+    def gray_key(self) -> str:
+        return GrayCache.key(self.path, self.fps or self.get_source_fps(), self.decoder, self.reducer, self._bounds_key())
+    
+    def get_gray(self, frame_size) -> Optional[GrayFrames]:
+        """Grayscale frames of the video at `frame_size` or larger, when they were decoded before."""
+        if not self.uses_gray_cache:
+            return None
+        return self.gray_cache.get(self.gray_key(), frame_size)
+    
+    def read_gray(self, frame_size) -> Optional[FrameStore]:
+        gray_frames = self.get_gray(frame_size)
+        if gray_frames is None:
+            return None
+        with _measure(self.stats, "map"):
+            return gray_frames.to_store(frame_size, self.ascii_chars, self.reducer)
+    
+    def _iter_ascii_runs(self, frame_size, callback=_callback, ascii_lut=None, sink=None):
+        ascii_lut = self.ascii_lut if (ascii_lut is None) else ascii_lut
+        start, stop = self.get_bounds()
+        capture = self.open_capture(frame_size, start)
+        try:
+            yield from iter_frame_runs(
+                capture, start, stop, frame_size, ascii_lut, self.get_source_fps(), self.fps, self.stats,
+                lambda i: callback(i - start + 1, stop - start), sink, self.reducer
+            )
+        finally:
+            capture.release()
+    
+    def _iter_gray_filling(self, frame_size, callback=_callback, ascii_lut=None):
+        """Runs of a conversion that also writes its grayscale frames to `self.gray_cache`."""
+        writer = self.gray_cache.open_writer(self.gray_key(), frame_size)
+        runs = self._iter_ascii_runs(frame_size, callback, ascii_lut, writer.append)
+        complete = False
+        try:
+            yield from runs
+            complete = True
+        finally:
+            runs.close()
+            if complete and (writer.count > 0):
+                writer.commit()
             else:
-                break
-        capture.release()
-        return al
+                writer.abort()
+    
+    def _fill_gray(self, frame_size, method, *args, **kwargs) -> FrameStore:
+        """Runs the conversion `method` with a `GrayLUT`, writes its frames to `self.gray_cache` and maps them to the palette."""
+        # * Every mode converts through `self.palette_lut`, with the gray levels as the palette it gives the reduced frames.
+        palette_lut, self.palette_lut = self.palette_lut, GrayLUT()
+        try:
+            gray_store = method(self, frame_size, *args, **kwargs)
+        finally:
+            self.palette_lut = palette_lut
+        if gray_store.count == 0:
+            return gray_store
+        writer = self.gray_cache.open_writer(self.gray_key(), frame_size)
+        try:
+            for gray_frame, repeats in zip(gray_store.chars, gray_store.repeats.tolist()):
+                writer.append(gray_frame, repeats)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+        return FrameStore.from_indices(np.take(palette_lut.index_lut, gray_store.chars), gray_store.repeats, self.ascii_chars)
+    
+    def _iter_caching(self, frame_size, runs):
+        """Passes `runs` on and writes them to the cache, the entry is kept only when every frame went through."""
+        writer = self.cache.open_writer(self.cache_key(frame_size), self.get_fps(), frame_size, self.ascii_chars)
+        complete = False
+        try:
+            for frame, repeats in runs:
+                writer.write_frame(frame, repeats)
+                yield frame, repeats
+            complete = True
+        finally:
+            runs.close()
+            if complete and (writer.frames_count > 0):
+                writer.commit()
+            else:
+                writer.abort()
+    
+    def _runs(self, frame_size, callback=_callback):
+        """Runs of the cache entry, of the grayscale frames, or of a conversion that fills the caches."""
+        avfile = self.get_cached(frame_size)
+        if avfile is not None:
+            return self._iter_cached(avfile)
+        gray_frames = self.get_gray(frame_size)
+        if gray_frames is not None:
+            return gray_frames.iter_runs(frame_size, self.ascii_lut, self.reducer)
+        runs = self._iter_gray_filling(frame_size, callback) if self.uses_gray_cache \
+            else self._iter_ascii_runs(frame_size, callback)
+        if self.cache is not None:
+            runs = self._iter_caching(frame_size, runs)
+        return runs
+    
+    def iter_ascii_runs(self, frame_size, prefetch=64, callback=_callback):
+        return AsciiFramesStream(self._runs(frame_size, callback), prefetch, self.stats)
     
+    def iter_ascii_frames(self, frame_size, prefetch=64, callback=_callback):
+        return AsciiFramesStream(expand_runs(self._runs(frame_size, callback)), prefetch, self.stats)
+    
+    def _store(self, runs) -> FrameStore:
+        return FrameStore.from_runs(runs, self.ascii_chars, self.color_mode)
+    
+    @_cached
+    def get_ascii_frames(self, frame_size, callback=_callback):
+        return self._store(self._iter_ascii_runs(frame_size, callback, self.palette_lut))
+    
+    @_cached
     def get_ascii_frames_threading(self, frame_size, callback=_callback):
-        capture = cv2.VideoCapture(self.path)
-        capture.set(1, 1)
-        frames_count = self.get_frames_count()
-        thfn = ThreadingFrameHandler(frames_count, frame_size, callback, self.ascii_chars_gradient)
-        for i in range(1, frames_count):
-            ret, image_frame = capture.read()
-            thfn.get_acsii_frame(i, (ret, image_frame))
-        while thfn.frames_count > thfn.done:
-            time.sleep(0.01)
+        start, stop = self.get_bounds()
+        thfn = ThreadingFrameHandler(
+            stop - start, frame_size, callback, self.ascii_chars_gradient,
+            stats=self.stats, ascii_lut=self.palette_lut, reducer=self.reducer
+        )
+        # * A reused buffer is read again only after the frames in flight before it are converted.
+        capture = self.open_capture(frame_size, start, thfn.max_in_flight + 1)
+        idx = 1
+        for i in range(start, stop):
+            repeats = self._frame_repeats(i)
+            if repeats == 0:
+                if not capture.grab():
+                    break
+                continue
+            ret, image_frame = read_frame(capture, self.stats)
+            if not ret:
+                break
+            thfn.get_acsii_frame(idx, (ret, image_frame), repeats)
+            idx += 1
         capture.release()
-        return thfn.pl.to_list()
+        return self._store(thfn.join())
+    
+    def iter_ascii_runs_segmented(self, frame_size, callback=_callback, processes=None, ascii_lut=None):
+        """Yields the runs of `get_ascii_frames_segmented` in order, one segment is held at a time."""
+        ascii_lut = self.ascii_lut if (ascii_lut is None) else ascii_lut
+        processes = processes or os.cpu_count() or 1
+        start, stop = self.get_bounds()
+        segments = split_segments(start, stop, processes * 4)
+        done, pending = 0, None
+        # * "spawn": a forked child can deadlock inside the OpenCV thread pool of the parent.
+        with get_context("spawn").Pool(processes) as pool:
+            tasks = [
+                (
+                    self.path, segment_start, segment_stop, frame_size, ascii_lut, self.get_source_fps(), self.fps,
+                    self.stats is not None, self.decoder, self.reducer
+                )
+                for segment_start, segment_stop in segments
+            ]
+            for (segment_start, segment_stop), (segment_runs, segment_stats) in zip(segments, pool.imap(_convert_segment, tasks)):
+                if segment_stats is not None:
+                    self.stats.merge(segment_stats)
+                done += segment_stop - segment_start
+                callback(done, stop - start)
+                # * The last run of a segment is held back, the next segment may continue it.
+                for frame, repeats in segment_runs:
+                    if (pending is not None) and same_frame(pending[0], frame):
+                        pending[1] += repeats
+                        continue
+                    if pending is not None:
+                        yield tuple(pending)
+                    pending = [frame, repeats]
+            if pending is not None:
+                yield tuple(pending)
+            pool.close()
+            pool.join()
     
+    @_cached
+    def get_ascii_frames_segmented(self, frame_size, callback=_callback, processes=None):
+        return self._store(self.iter_ascii_runs_segmented(frame_size, callback, processes, self.palette_lut))
+    
+    @_cached
     def get_ascii_frames_multiprocessing(self, frame_size, callback=_callback):
-        capture = cv2.VideoCapture(self.path)
-        capture.set(1, 1)
-        frames_count: int = self.get_frames_count()
-        mpfn = MultiprocessingFrameHandler(frames_count, frame_size, callback)
-        for i in range(1, frames_count):
-            ret, image_frame = capture.read()
-            mpfn.add_task_data(i, ret, image_frame)
+        start, stop = self.get_bounds()
+        capture = self.open_capture(frame_size, start, None)
+        mpfn = MultiprocessingFrameHandler(
+            stop - start, frame_size, callback, self.ascii_chars_gradient, self.stats, self.palette_lut, self.reducer
+        )
+        # * Handler slots are counted from `start`.
+        repeats: Dict[int, int] = {}
+        for i in range(start, stop):
+            repeats[i - start] = self._frame_repeats(i)
+            if repeats[i - start] == 0:
+                capture.grab()
+                continue
+            ret, image_frame = read_frame(capture, self.stats)
+            mpfn.add_task_data(i - start, ret, image_frame)
+        capture.release()
         mpfn.proccessing()
-        return mpfn.pl.to_list()
+        return self._store(mpfn.runs(repeats))
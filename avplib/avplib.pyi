@@ -1,13 +1,27 @@
-from io import BufferedReader
+from io import BufferedReader, BytesIO
 from numpy import ndarray
 import moviepy.editor as mpe
-from typing import overload, List, Tuple, Literal, Any
+from threading import Thread, Event, Condition
+from typing import overload, List, Tuple, Literal, Any, Iterator, Optional, Union
 from .units import ASCII_CHARS
+from .engine import ASCII_LUT, REDUCER
+from .color import PaletteLUT, ColorFrame
+from .store import FrameStore
+from .avf import AVFile
+from .cache import ConversionCache
+from .gray import GrayCache, GrayFrames
+from .stats import PipelineStats
+from .decoder import DECODER
 
 init_multiprocessing: bool
 
 PATH = str
 WAV_FILE_BYTES = bytes
+FRAME_LUT = Union[ASCII_LUT, PaletteLUT]
+FRAME = Union[str, ColorFrame]
+POSITION = Tuple[Literal["frame", "time"], float]
+RUN = Tuple[FRAME, int]
+COLOR_MODE = Literal["none", "256", "truecolor"]
 
 class TempDetected:
     files: List[str]
@@ -18,36 +32,154 @@ class TempDetected:
 
 TEMP_DETECTOR = TempDetected()
 
+class AsciiFramesStream:
+    prefetch: int
+    buffering: Condition
+    finished: Event
+    stopped: Event
+    exhausted: bool
+    error: Optional[BaseException]
+    thread: Thread
+    
+    stats: Optional[PipelineStats]
+    
+    def __init__(self, frames: Iterator[FRAME], prefetch: int=64, stats: Optional[PipelineStats]=None) -> None: ...
+    @property
+    def buffered(self) -> int: ...
+    def wait(self, low_water: int, timeout: Optional[float]=None) -> bool:
+        """Blocks until `low_water` frames are buffered or the conversion is finished."""
+        ...
+    def __iter__(self) -> AsciiFramesStream: ...
+    def __next__(self) -> FRAME: ...
+    def close(self) -> None: ...
+    def __enter__(self) -> AsciiFramesStream: ...
+    def __exit__(self, *args) -> None: ...
+
 class AVP:
+    ascii_chars: List[str]
+    cache: Optional[ConversionCache]
+    gray_cache: Optional[GrayCache]
+    """Grayscale frames decoded once per video, any chars and smaller resolutions are mapped from them."""
+    color_mode: COLOR_MODE
+    decoder: DECODER
+    """`"ffmpeg"` only when its binary was found, otherwise `"opencv"`."""
+    reducer: REDUCER
+    """`"pillow"` gives the chars of the original conversion, `"opencv"` reduces the frames faster."""
     ascii_chars_gradient: List[str]
+    ascii_lut: FRAME_LUT
+    palette_lut: PaletteLUT
     path: PATH
     video: mpe.VideoFileClip
+    fps: Optional[int]
+    source_fps: Optional[float]
+    start: Optional[int]
+    end: Optional[int]
+    """Source frames converted, see `set_bounds`."""
+    stats: Optional[PipelineStats]
+    """Set a `PipelineStats` to time every stage of the conversion."""
     
     @overload
-    def __init__(self, fp: str, ascii_chars: List[str]=ASCII_CHARS) -> None: ...
+    def __init__(
+        self,
+        fp: str,
+        ascii_chars: List[str]=ASCII_CHARS,
+        cache: Optional[ConversionCache]=None,
+        color_mode: COLOR_MODE="none",
+        decoder: DECODER="opencv",
+        gray_cache: Optional[GrayCache]=None,
+        reducer: REDUCER="pillow"
+    ) -> None: ...
     @overload
-    def __init__(self, fp: bytes, ascii_chars: List[str]=ASCII_CHARS) -> None: ...
+    def __init__(
+        self,
+        fp: bytes,
+        ascii_chars: List[str]=ASCII_CHARS,
+        cache: Optional[ConversionCache]=None,
+        color_mode: COLOR_MODE="none",
+        decoder: DECODER="opencv",
+        gray_cache: Optional[GrayCache]=None,
+        reducer: REDUCER="pillow"
+    ) -> None: ...
     @overload
-    def __init__(self, fp: BufferedReader, ascii_chars: List[str]=ASCII_CHARS) -> None: ...
+    def __init__(
+        self,
+        fp: BufferedReader,
+        ascii_chars: List[str]=ASCII_CHARS,
+        cache: Optional[ConversionCache]=None,
+        color_mode: COLOR_MODE="none",
+        decoder: DECODER="opencv",
+        gray_cache: Optional[GrayCache]=None,
+        reducer: REDUCER="pillow"
+    ) -> None: ...
     
     @staticmethod
     def _callback(complited: int, total: int) -> None: ...
     
+    def get_audio_stream(self, audio_format: Literal["wav", "flac", "ogg"]="ogg", fps: int=44100) -> BytesIO:
+        """Encodes the audio track in memory, the decoded samples are processed one second at a time."""
+        ...
+    
     @overload
     def get_audio(self, tp: Literal["file"], filepath: str=None) -> PATH: ...
     @overload
-    def get_audio(self, tp: Literal["bytes"]) -> WAV_FILE_BYTES: ...
+    def get_audio(self, tp: Literal["bytes"], audio_format: Literal["wav", "flac", "ogg"]="wav") -> WAV_FILE_BYTES: ...
+    @overload
+    def get_audio(self, tp: Literal["stream"], audio_format: Literal["wav", "flac", "ogg"]="wav") -> BytesIO: ...
     @overload
     def get_audio(self, tp: Literal["array"]) -> ndarray: ...
     @overload
     def get_audio(self, tp: Any) -> None: ...
 
+    def set_bounds(self, start: Union[int, POSITION, None]=None, end: Union[int, POSITION, None]=None) -> None:
+        """Only the source frames from `start` up to `end` (excluded) are converted, the decoder seeks straight to `start`."""
+        ...
+    def frame_at(self, seconds: float) -> int: ...
+    def position_frame(self, position: POSITION) -> int: ...
+    def get_bounds(self) -> Tuple[int, int]: ...
+    @property
+    def audio(self) -> Optional[mpe.AudioFileClip]:
+        """The audio clip of the video, cut to the bounds of `set_bounds`."""
+        ...
+    def open_capture(self, frame_size: Tuple[int, int], start: int=1, buffers: Optional[int]=1) -> Any: ...
+    def cache_key(self, frame_size: Tuple[int, int]) -> str: ...
+    def get_cached(self, frame_size: Tuple[int, int]) -> Optional[AVFile]: ...
+    def read_cache(self, frame_size: Tuple[int, int]) -> Optional[FrameStore]: ...
+    def write_cache(self, frame_size: Tuple[int, int], frames: FrameStore) -> None: ...
+    @property
+    def uses_gray_cache(self) -> bool: ...
+    def gray_key(self) -> str: ...
+    def get_gray(self, frame_size: Tuple[int, int]) -> Optional[GrayFrames]: ...
+    def read_gray(self, frame_size: Tuple[int, int]) -> Optional[FrameStore]: ...
+    
     def get_frames_count(self) -> int:
         """Returns the number of `frames`"""
         ...
 
-    def get_ascii_frames(self, frame_size: Tuple[int, int], callback=_callback) -> List[str]: ...
-    def get_ascii_frames_threading(self, frame_size: Tuple[int, int], callback=_callback) -> List[str]: ...
-    def get_ascii_frames_multiprocessing(self, frame_size: Tuple[int, int], callback=_callback) -> List[str]: ...
+    def iter_ascii_frames(self, frame_size: Tuple[int, int], prefetch: int=64, callback=_callback) -> AsciiFramesStream:
+        """Converts frames in the background, at most `prefetch` frames are kept in memory."""
+        ...
+    def iter_ascii_runs(self, frame_size: Tuple[int, int], prefetch: int=64, callback=_callback) -> AsciiFramesStream:
+        """Like `iter_ascii_frames`, the stream yields `(frame, repeats)` runs and a held frame is converted once."""
+        ...
+    def get_ascii_frames(self, frame_size: Tuple[int, int], callback=_callback) -> FrameStore:
+        """The frames are kept as palette indices, the text is made when a frame is accessed."""
+        ...
+    def get_ascii_frames_threading(self, frame_size: Tuple[int, int], callback=_callback) -> FrameStore: ...
+    def get_ascii_frames_multiprocessing(self, frame_size: Tuple[int, int], callback=_callback) -> FrameStore: ...
+    def iter_ascii_runs_segmented(
+        self,
+        frame_size: Tuple[int, int],
+        callback=_callback,
+        processes: Optional[int]=None,
+        ascii_lut: Optional[FRAME_LUT]=None
+    ) -> Iterator[RUN]:
+        """Yields the runs of `get_ascii_frames_segmented` in order, one segment is held at a time."""
+        ...
+    def get_ascii_frames_segmented(self, frame_size: Tuple[int, int], callback=_callback, processes: Optional[int]=None) -> FrameStore:
+        """Every process decodes and converts its own range of frames."""
+        ...
+    def get_source_fps(self) -> float: ...
     def get_fps(self) -> int: ...
-    def set_fps(self, fps: int) -> None: ...
\ No newline at end of file
+    def set_fps(self, fps: int) -> None:
+        """Frames are picked or repeated while decoding to hit `fps`, the video is not re-encoded."""
+        ...
\ No newline at end of file
@@ -0,0 +1,163 @@
+import os
+import glob
+import time
+import queue
+from threading import Thread, Event
+from zipfile import ZipFile, BadZipFile
+from multiprocessing import get_context
+# > Typing
+from typing import List, Tuple, Dict, Any, Optional, Callable
+# > Local Imports
+from .avf import AVFile
+from .compression import DEFAULT_CODEC
+from .units import ASCII_CHARS, VIDEO_EXTENSIONS
+
+# ! Types
+# * (job index, number of frames or None on failure, seconds, error)
+RESULT = Tuple[int, Optional[int], float, Optional[str]]
+
+# ! Constants
+PART_SUFFIX = ".part"
+# * Frames between two progress messages of a worker.
+PROGRESS_STEP = 16
+
+# ! Worker State
+_progress = None
+
+# > Functions
+def is_glob(pattern: str) -> bool:
+    return any((char in pattern) for char in "*?[")
+
+def collect_sources(source: str) -> Tuple[str, List[str]]:
+    """Video files of a directory (recursively) or of a glob pattern, and the directory their outputs are relative to."""
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(root, name)
+            for root, dirs, files in os.walk(source)
+            for name in files
+            if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS
+        ]
+        base = source
+    else:
+        paths = [path for path in glob.glob(source, recursive=True) if os.path.isfile(path)]
+        base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths]) if (len(paths) > 0) else "."
+    return os.path.abspath(base), sorted(os.path.abspath(path) for path in paths)
+
+def output_path(path: str, base: str, output_dir: str) -> str:
+    return os.path.join(os.path.abspath(output_dir), os.path.splitext(os.path.relpath(path, base))[0] + ".avf")
+
+def is_complete(path: str) -> bool:
+    """Outputs are renamed into place only when they are finished, so an existing readable archive is complete."""
+    try:
+        with ZipFile(path) as avf_zip:
+            return "info" in avf_zip.namelist()
+    except (OSError, BadZipFile):
+        return False
+
+def convert_file(
+    source: str,
+    target: str,
+    res: Tuple[int, int]=(120, 30),
+    fps: int=30,
+    ascii_chars: List[str]=ASCII_CHARS,
+    encoding: str="raw",
+    color_mode: str="none",
+    decoder: str="opencv",
+    reducer: str="pillow",
+    codec: str=DEFAULT_CODEC,
+    level: Optional[int]=None,
+    audio_format: str="ogg",
+    no_audio: bool=False,
+    title: str="",
+    author: str="",
+    start=None,
+    end=None,
+    callback=None
+) -> int:
+    """Converts one video into `target`, the file is written under a temporary name and renamed at the end."""
+    from .avplib import AVP, _callback
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    part = target + PART_SUFFIX
+    try:
+        video = AVP(source, ascii_chars, color_mode=color_mode, decoder=decoder, reducer=reducer)
+        if fps != video.get_fps():
+            video.set_fps(fps)
+        video.set_bounds(start, end)
+        with_audio = (not no_audio) and (video.video.audio is not None)
+        avfile = AVFile(part, "w", codec, level)
+        try:
+            avfile.set_info(title, author, fps, res, with_audio, ascii_chars)
+            if with_audio:
+                avfile.set_audio_from_bytes(video.get_audio("bytes", audio_format=audio_format), audio_format)
+            with avfile.open_video_writer(encoding=encoding) as writer:
+                with video.iter_ascii_runs(res, callback=callback or _callback) as runs:
+                    writer.write_runs(runs)
+        finally:
+            avfile.close()
+        os.replace(part, target)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    return writer.frames_count
+
+def _init_worker(progress) -> None:
+    global _progress
+    _progress = progress
+
+def _convert_job(job: Tuple[int, str, str, Dict[str, Any]]) -> RESULT:
+    idx, source, target, options = job
+    st, last = time.time(), [0]
+    def callback(done: int, total: int) -> None:
+        if (done - last[0] >= PROGRESS_STEP) or (done >= total - 1):
+            last[0] = done
+            _progress.put((idx, done, total))
+    try:
+        frames = convert_file(source, target, callback=callback, **options)
+    except Exception as e:
+        message = (str(e).strip().splitlines() or [""])[0]
+        return idx, None, time.time() - st, f"{type(e).__name__}: {message}"
+    return idx, frames, time.time() - st, None
+
+def run_batch(
+    jobs: List[Tuple[str, str]],
+    options: Dict[str, Any],
+    processes: Optional[int]=None,
+    on_progress: Optional[Callable[[int, int, int], None]]=None,
+    on_result: Optional[Callable[[RESULT], None]]=None
+) -> List[RESULT]:
+    """Converts `(source, target)` jobs on a pool of `processes`, every worker imports the heavy modules once.
+
+    The biggest files are started first, so a long one does not end up alone at the tail of the run."""
+    if len(jobs) == 0:
+        return []
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    order = sorted(range(len(jobs)), key=lambda idx: os.path.getsize(jobs[idx][0]), reverse=True)
+    tasks = [(idx, jobs[idx][0], jobs[idx][1], options) for idx in order]
+    # * "spawn": a forked child can deadlock inside the OpenCV thread pool of the parent.
+    context = get_context("spawn")
+    progress, finished, results = context.Queue(), Event(), []
+
+    def report() -> None:
+        while not (finished.is_set() and progress.empty()):
+            try:
+                message = progress.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if on_progress is not None:
+                on_progress(*message)
+
+    reporter = Thread(target=report, daemon=True)
+    reporter.start()
+    try:
+        with context.Pool(processes, _init_worker, (progress,)) as pool:
+            for result in pool.imap_unordered(_convert_job, tasks):
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+            pool.close()
+            pool.join()
+    finally:
+        finished.set()
+        reporter.join()
+    return sorted(results)
@@ -0,0 +1,144 @@
+import os
+import json
+import hashlib
+import tempfile
+# > Typing
+from typing import Iterable, Optional, Tuple, List, Union
+# > Local Imports
+from .avf import AVFile
+from .color import ColorFrame
+from .units import CACHE_SIZE
+
+# ! Constants
+CACHE_SUFFIX = ".avf"
+# * Entries are written while the video plays, the fastest codec is used.
+CACHE_CODEC = "fast"
+
+# ! Main Class
+class ConversionCache:
+    """On-disk cache of converted frames, one AVF file per conversion.
+
+    Least recently used entries are removed when the cache is over `max_size` bytes."""
+    def __init__(self, cache_dir: str, max_size: int=CACHE_SIZE) -> None:
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(
+        path: str,
+        frame_size: Tuple[int, int],
+        ascii_chars: List[str],
+        fps: float,
+        color_mode: str="none",
+        decoder: str="opencv",
+        reducer: str="pillow",
+        bounds: Optional[Tuple[int, int]]=None
+    ) -> str:
+        stat = os.stat(path)
+        identity = [os.path.realpath(path), stat.st_size, stat.st_mtime_ns, list(frame_size), list(ascii_chars), fps]
+        if color_mode != "none":
+            identity.append(color_mode)
+        if decoder != "opencv":
+            identity.append(decoder)
+        if reducer != "pillow":
+            identity.append(reducer)
+        if bounds is not None:
+            identity.append(list(bounds))
+        return hashlib.sha256(json.dumps(identity).encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> Optional[AVFile]:
+        path = self.path(key)
+        try:
+            avfile = AVFile(path, "r")
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+        os.utime(path)
+        return avfile
+
+    def open_writer(self, key: str, fps: float, res: Tuple[int, int], ascii_chars: List[str]) -> "CacheWriter":
+        return CacheWriter(self, key, fps, res, ascii_chars)
+    
+    def put(
+        self,
+        key: str,
+        runs: Iterable[Tuple[Union[str, ColorFrame], int]],
+        fps: float,
+        res: Tuple[int, int],
+        ascii_chars: List[str]
+    ) -> str:
+        """Writes `(frame, repeats)` pairs as the entry `key`."""
+        writer = self.open_writer(key, fps, res, ascii_chars)
+        try:
+            writer.write_runs(runs)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def entries(self) -> List[Tuple[str, os.stat_result]]:
+        return [
+            (entry.path, entry.stat())
+            for entry in os.scandir(self.cache_dir)
+            if entry.name.endswith(CACHE_SUFFIX)
+        ]
+
+    def size(self) -> int:
+        return sum(stat.st_size for path, stat in self.entries())
+
+    def evict(self) -> None:
+        entries = sorted(self.entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for path, stat in entries)
+        for path, stat in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= stat.st_size
+
+    def clear(self) -> None:
+        for path, stat in self.entries():
+            os.remove(path)
+
+class CacheWriter:
+    """Streams frames into a temporary cache entry, it becomes visible on `commit` only."""
+    def __init__(self, cache: ConversionCache, key: str, fps: float, res: Tuple[int, int], ascii_chars: List[str]) -> None:
+        self.cache = cache
+        self.key = key
+        fd, self.temp_path = tempfile.mkstemp(suffix=".tmp", dir=cache.cache_dir)
+        os.close(fd)
+        self.avfile = AVFile(self.temp_path, "w", CACHE_CODEC)
+        self.avfile.set_info(fps=fps, res=res, ascii_chars=ascii_chars)
+        self.writer = self.avfile.open_video_writer()
+    
+    @property
+    def frames_count(self) -> int:
+        return self.writer.frames_count
+    
+    def write_frame(self, frame: Union[str, ColorFrame], repeats: int=1) -> None:
+        self.writer.write_frame(frame, repeats)
+    
+    def write_frames(self, frames: Iterable[Union[str, ColorFrame]]) -> None:
+        self.writer.write_frames(frames)
+    
+    def write_runs(self, runs: Iterable[Tuple[Union[str, ColorFrame], int]]) -> None:
+        self.writer.write_runs(runs)
+    
+    def commit(self) -> str:
+        try:
+            self.writer.close()
+            self.avfile.close()
+            os.replace(self.temp_path, self.cache.path(self.key))
+        except BaseException:
+            self.abort()
+            raise
+        self.cache.evict()
+        return self.cache.path(self.key)
+    
+    def abort(self) -> None:
+        self.avfile.abort()
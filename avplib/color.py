@@ -0,0 +1,130 @@
+import functools
+import numpy as np
+# > Typing
+from typing import Tuple, List, Literal, Optional
+# > Local Imports
+from .units import COLOR_MODES
+
+# ! Types
+COLOR_MODE = Literal["256", "truecolor"]
+
+# ! Constants
+RESET = b"\x1b[0m"
+NEWLINE = ord("\n")
+# * Channel levels of the xterm 6x6x6 color cube (colors 16-231).
+CUBE_LEVELS = np.array([0, 95, 135, 175, 215, 255])
+CUBE_LUT = np.abs(np.arange(256)[:, None] - CUBE_LEVELS[None, :]).argmin(axis=1).astype(np.uint16)
+
+# > Functions
+def generate_index_lut(ascii_chars: List[str]) -> np.ndarray:
+    """Lookup table `pixel -> index in ascii_chars`, the same gradient as `generate_ascii_chars_gradient`."""
+    return (np.arange(256) // (int(256 / len(ascii_chars)) + 1)).astype(np.uint8)
+
+def quantize_colors(bgr_frame: np.ndarray, color_mode: COLOR_MODE) -> np.ndarray:
+    """Maps every cell to a color index: `uint8` xterm colors or `uint16` RGB555."""
+    if color_mode == "256":
+        cube = CUBE_LUT[bgr_frame]
+        return (16 + 36 * cube[..., 2] + 6 * cube[..., 1] + cube[..., 0]).astype(np.uint8)
+    rgb555 = (bgr_frame >> 3).astype(np.uint16)
+    return (rgb555[..., 2] << 10) | (rgb555[..., 1] << 5) | rgb555[..., 0]
+
+def color_dtype(color_mode: COLOR_MODE) -> np.dtype:
+    return np.dtype(np.uint8) if (color_mode == "256") else np.dtype("<u2")
+
+@functools.lru_cache(maxsize=None)
+def color_escapes(color_mode: COLOR_MODE) -> List[bytes]:
+    """Escape sequence of every color index."""
+    if color_mode == "256":
+        return [b"\x1b[38;5;%dm" % i for i in range(256)]
+    return [
+        b"\x1b[38;2;%d;%d;%dm" % tuple(((c << 3) | (c >> 2)) for c in ((i >> 10) & 31, (i >> 5) & 31, i & 31))
+        for i in range(1 << 15)
+    ]
+
+@functools.lru_cache(maxsize=16)
+def char_table(ascii_chars: Tuple[str, ...]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """UTF-8 byte length of every char and, for ASCII-only chars, their byte values."""
+    encoded = [char.encode() for char in ascii_chars]
+    lengths = np.array([len(char) for char in encoded], dtype=np.int64)
+    table = np.frombuffer(b"".join(encoded), dtype=np.uint8) if (lengths == 1).all() else None
+    return lengths, table
+
+# ! Classes
+class PaletteLUT:
+    """Converts frames into palette indices (`pixel -> index in ascii_chars`) instead of text."""
+    color_mode = "none"
+    
+    def __init__(self, ascii_chars: List[str]) -> None:
+        self.ascii_chars = list(ascii_chars)
+        self.index_lut = generate_index_lut(self.ascii_chars)
+
+class ColorLUT(PaletteLUT):
+    """What a worker needs to convert a frame into a `ColorFrame`, it takes the place of the ASCII lookup table."""
+    def __init__(self, ascii_chars: List[str], color_mode: COLOR_MODE) -> None:
+        assert color_mode in COLOR_MODES[1:]
+        super().__init__(ascii_chars)
+        self.color_mode = color_mode
+
+class ColorFrame:
+    """A colored frame stored as a char plane (indices in `ascii_chars`) and a plane of quantized colors.
+
+    The escape sequences are only produced when the frame is drawn, one per run of equal color."""
+    __slots__ = ("chars", "colors", "color_mode", "ascii_chars")
+
+    def __init__(self, chars: np.ndarray, colors: np.ndarray, color_mode: COLOR_MODE, ascii_chars: List[str]) -> None:
+        self.chars = chars
+        self.colors = colors
+        self.color_mode = color_mode
+        self.ascii_chars = ascii_chars
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.chars.shape
+
+    def tobytes(self) -> bytes:
+        """The char plane followed by the color plane, the layout stored in AVF files."""
+        return self.chars.tobytes() + self.colors.astype(color_dtype(self.color_mode), copy=False).tobytes()
+
+    @classmethod
+    def frombytes(cls, data: bytes, shape: Tuple[int, int], color_mode: COLOR_MODE, ascii_chars: List[str]) -> "ColorFrame":
+        cells = shape[0] * shape[1]
+        chars = np.frombuffer(data, dtype=np.uint8, count=cells).reshape(shape)
+        colors = np.frombuffer(data, dtype=color_dtype(color_mode), offset=cells).reshape(shape)
+        return cls(chars, colors, color_mode, ascii_chars)
+
+    def layout(self) -> Tuple[bytes, np.ndarray, np.ndarray]:
+        """Plain text of the frame with the start and end byte offsets of every cell."""
+        height, width = self.chars.shape
+        lengths, table = char_table(tuple(self.ascii_chars))
+        if table is not None:
+            buffer = np.empty((height, width+1), dtype=np.uint8)
+            np.take(table, self.chars, out=buffer[:, :width])
+            buffer[:, width] = NEWLINE
+            data = buffer.tobytes()
+        else:
+            data = "\n".join(["".join([self.ascii_chars[i] for i in row]) for row in self.chars.tolist()]).encode() + b"\n"
+        cell_lengths = np.ones((height, width+1), dtype=np.int64)
+        np.take(lengths, self.chars, out=cell_lengths[:, :width])
+        ends = np.cumsum(cell_lengths, axis=None).reshape(height, width+1)
+        cell_ends = ends[:, :width].ravel()
+        return data[:-1], cell_ends - cell_lengths[:, :width].ravel(), cell_ends
+
+    def text(self) -> str:
+        return self.layout()[0].decode()
+
+    def to_bytes(self) -> bytes:
+        """Text with one escape sequence per run of equal color."""
+        data, cell_starts, cell_ends = self.layout()
+        flat = self.colors.ravel()
+        starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+        escapes = color_escapes(self.color_mode)
+        positions = cell_starts[starts].tolist() + [len(data)]
+        output = []
+        for color, start, end in zip(flat[starts].tolist(), positions, positions[1:]):
+            output.append(escapes[color])
+            output.append(data[start:end])
+        output.append(RESET)
+        return b"".join(output)
+
+    def __str__(self) -> str:
+        return self.to_bytes().decode()
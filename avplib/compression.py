@@ -0,0 +1,102 @@
+import importlib
+import importlib.util
+from zipfile import ZIP_STORED, ZIP_DEFLATED, ZIP_BZIP2, ZIP_LZMA
+# > Typing
+from typing import Dict, Any, List, Optional, Tuple
+
+# ! Constants
+# * name: (zip method, default level, (lowest level, highest level) or None without levels, optional module)
+CODECS: Dict[str, Tuple[int, Optional[int], Optional[Tuple[int, int]], Optional[str]]] = {
+    "stored": (ZIP_STORED, None, None, None),
+    "deflate": (ZIP_DEFLATED, 9, (0, 9), None),
+    "bzip2": (ZIP_BZIP2, 9, (1, 9), None),
+    "lzma": (ZIP_LZMA, None, None, None),
+    "zstd": (ZIP_STORED, 3, (1, 22), "zstandard"),
+    "lz4": (ZIP_STORED, 0, (0, 16), "lz4.frame")
+}
+# * preset: ((codec, level), ...) the first available codec is used
+PRESETS: Dict[str, List[Tuple[str, Optional[int]]]] = {
+    "fast": [("zstd", 1), ("lz4", 0), ("deflate", 1)],
+    "balanced": [("zstd", 9), ("deflate", 6)],
+    "small": [("lzma", None)]
+}
+DEFAULT_CODEC = "deflate"
+
+# ! Exceptions
+class InvalidLevel(ValueError):
+    pass
+
+# > Functions
+def codec_available(name: str) -> bool:
+    module = CODECS[name][3]
+    if module is None:
+        return True
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+def available_codecs() -> List[str]:
+    return [name for name in CODECS if codec_available(name)]
+
+def resolve_codec(name: str, level: Optional[int]=None) -> Tuple[str, Optional[int]]:
+    """Turns a preset into a codec, fills in the default level and checks the level against the range of the codec."""
+    if name in PRESETS:
+        for codec_name, preset_level in PRESETS[name]:
+            if codec_available(codec_name):
+                name, level = codec_name, (preset_level if (level is None) else level)
+                break
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec {name!r}")
+    if not codec_available(name):
+        raise ValueError(f"The codec {name!r} needs the {CODECS[name][3].split('.')[0]!r} module")
+    if level is None:
+        return name, CODECS[name][1]
+    levels = CODECS[name][2]
+    if levels is None:
+        raise InvalidLevel(f"The codec {name!r} has no compression level")
+    if not (levels[0] <= level <= levels[1]):
+        raise InvalidLevel(f"The level of {name!r} is from {levels[0]} to {levels[1]}, not {level}")
+    return name, level
+
+# ! Main Class
+class Codec:
+    """Compression of the video chunks of an AVF file.
+
+    Zip methods are applied by `zipfile` itself, the optional backends compress
+    the chunk before it is stored in the archive uncompressed."""
+    def __init__(self, name: str=DEFAULT_CODEC, level: Optional[int]=None) -> None:
+        self.name, self.level = resolve_codec(name, level)
+        self.compress_type, default_level, levels, module = CODECS[self.name]
+        self.backend = importlib.import_module(module) if (module is not None) else None
+
+    @property
+    def zip_level(self) -> Optional[int]:
+        return self.level if (self.backend is None) else None
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == "zstd":
+            return self.backend.ZstdCompressor(level=self.level).compress(data)
+        if self.name == "lz4":
+            return self.backend.compress(data, compression_level=self.level)
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.name == "zstd":
+            return self.backend.ZstdDecompressor().decompress(data)
+        if self.name == "lz4":
+            return self.backend.decompress(data)
+        return data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "level": self.level}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Codec":
+        """Files without a codec in the info were written with deflate at level 9."""
+        data = data or {"name": DEFAULT_CODEC, "level": 9}
+        name, level = data["name"], data.get("level")
+        # * Older files record the ignored level of codecs without levels.
+        if (name in CODECS) and (CODECS[name][2] is None):
+            level = None
+        return cls(name, level)
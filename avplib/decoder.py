@@ -0,0 +1,123 @@
+import os
+import shutil
+import functools
+import subprocess
+import numpy as np
+# > Typing
+from typing import Optional, Tuple, List, Literal
+# > Local Imports
+from .units import DECODERS
+
+# ! Types
+DECODER = Literal["opencv", "ffmpeg"]
+
+# ! Exceptions
+class DecoderUnavailable(RuntimeError):
+    pass
+
+# > Functions
+@functools.lru_cache(maxsize=None)
+def find_ffmpeg() -> Optional[str]:
+    """The binary MoviePy uses: `FFMPEG_BINARY`, the one of imageio-ffmpeg or the one on the `PATH`."""
+    binary = os.environ.get("FFMPEG_BINARY", "ffmpeg-imageio")
+    if binary != "ffmpeg-imageio":
+        return shutil.which(binary) or (binary if os.path.isfile(binary) else None)
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which("ffmpeg")
+
+def open_capture(
+    path: str,
+    frame_size: Tuple[int, int],
+    start: int=0,
+    decoder: DECODER="opencv",
+    color: bool=False,
+    buffers: Optional[int]=1
+):
+    """A `cv2.VideoCapture` or an `FFmpegReader` positioned at the frame `start`.
+
+    The ffmpeg reader falls back to OpenCV when its binary is missing or does not start."""
+    if decoder == "ffmpeg":
+        try:
+            return FFmpegReader(path, frame_size, "bgr24" if color else "gray", start, buffers)
+        except DecoderUnavailable:
+            pass
+    import cv2
+    capture = cv2.VideoCapture(path)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    return capture
+
+# ! Main Class
+class FFmpegReader:
+    """Frames decoded by an `ffmpeg` process, already scaled to `frame_size` and converted to `pix_fmt`.
+
+    Only `frame_size` bytes per cell come through the pipe, a few kilobytes instead of a full frame. The luma
+    and the area scaling of ffmpeg are not the ones of `engine.reduce_frame`: some chars differ from a conversion
+    with OpenCV, which is why the decoder is part of the cache keys. Has the `read`/`grab`/`release` part of the
+    `cv2.VideoCapture` interface. `read` returns one of `buffers` reused arrays, a frame stays valid for the next
+    `buffers - 1` reads (`None`: a new array every time)."""
+    def __init__(
+        self,
+        path: str,
+        frame_size: Tuple[int, int],
+        pix_fmt: Literal["gray", "bgr24"]="gray",
+        start: int=0,
+        buffers: Optional[int]=1
+    ) -> None:
+        binary = find_ffmpeg()
+        if binary is None:
+            raise DecoderUnavailable("ffmpeg was not found")
+        width, height = frame_size
+        self.shape = (height, width) if (pix_fmt == "gray") else (height, width, 3)
+        self.frame_bytes = int(np.prod(self.shape))
+        self.buffers: Optional[List[np.ndarray]] = None \
+            if (buffers is None) else [np.empty(self.shape, dtype=np.uint8) for i in range(buffers)]
+        self.scratch = np.empty(self.shape, dtype=np.uint8)
+        self.reads = 0
+        filters = [f"scale={width}:{height}:flags=area", f"format={pix_fmt}"]
+        if start > 0:
+            # * By frame number, timestamps do not map to frames exactly in every container (AVI, VFR).
+            # * The frames before `start` are decoded and dropped before they are scaled.
+            filters.insert(0, f"select=gte(n\\,{start})")
+        args = [
+            binary, "-nostdin", "-loglevel", "error",
+            "-i", path, "-an", "-sn", "-vf", ",".join(filters),
+            "-vsync", "0", "-f", "rawvideo", "-"
+        ]
+        try:
+            self.process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        except OSError as e:
+            raise DecoderUnavailable(str(e))
+
+    def _next_buffer(self) -> np.ndarray:
+        if self.buffers is None:
+            return np.empty(self.shape, dtype=np.uint8)
+        buffer = self.buffers[self.reads % len(self.buffers)]
+        self.reads += 1
+        return buffer
+
+    def _readinto(self, buffer: np.ndarray) -> bool:
+        view, filled = memoryview(buffer).cast("B"), 0
+        while filled < self.frame_bytes:
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        buffer = self._next_buffer()
+        if self._readinto(buffer):
+            return True, buffer
+        return False, None
+
+    def grab(self) -> bool:
+        return self._readinto(self.scratch)
+
+    def release(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.stdout.close()
+        self.process.wait()
@@ -0,0 +1,112 @@
+import cv2
+import hashlib
+import numpy as np
+# > Typing
+from typing import Tuple, List, Union, Literal
+# > Local Imports
+from .units import ASCII_CHARS_GRADIENTION
+from .color import ColorLUT, ColorFrame, quantize_colors
+
+# ! Types
+ASCII_LUT = Union[np.ndarray, List[str]]
+REDUCER = Literal["pillow", "opencv"]
+
+# ! Constants
+NEWLINE = ord("\n")
+
+# > Functions
+def generate_ascii_lut(ascii_chars_gradient: List[str]=ASCII_CHARS_GRADIENTION) -> ASCII_LUT:
+    """Precomputes a lookup table `pixel -> char` for `render_ascii_frame`.
+
+    Returns a `uint8` array when every char fits in one byte, otherwise the list of chars."""
+    chars = ascii_chars_gradient[:256]
+    try:
+        return np.frombuffer("".join(chars).encode("latin-1"), dtype=np.uint8).copy() \
+            if all(len(char) == 1 for char in chars) else chars
+    except UnicodeEncodeError:
+        return chars
+
+def reduce_frame(image_frame: np.ndarray, frame_size: Tuple[int, int], reducer: REDUCER="pillow") -> np.ndarray:
+    """Converts a decoded frame to grayscale and shrinks it to `frame_size` (width, height).
+
+    With `"pillow"` both steps are done by Pillow, the result is byte for byte the one of `Image.fromarray(...).convert("L").resize(...)`
+    (its integer luma and antialiased resampling): the chars are the same as those of the original `generate_ascii_frame`.
+    `"opencv"` does them with `cv2.cvtColor` and `cv2.resize(INTER_AREA)`, about three times faster, a few chars differ."""
+    if (image_frame.ndim == 2) and (image_frame.shape[::-1] == tuple(frame_size)):
+        return image_frame
+    if reducer == "opencv":
+        # * The channels are weighted as Pillow weights them, the first one as red.
+        gray_frame = image_frame if (image_frame.ndim == 2) else cv2.cvtColor(image_frame, cv2.COLOR_RGB2GRAY)
+        if gray_frame.shape[::-1] == tuple(frame_size):
+            return gray_frame
+        return cv2.resize(gray_frame, frame_size, interpolation=cv2.INTER_AREA)
+    from PIL import Image
+    image = Image.fromarray(image_frame)
+    if image.mode != "L":
+        image = image.convert("L")
+    if image.size != tuple(frame_size):
+        image = image.resize(frame_size)
+    return np.asarray(image)
+
+def map_ascii_frame(gray_frame: np.ndarray, ascii_lut: ASCII_LUT) -> Union[np.ndarray, List[str]]:
+    """Maps a reduced grayscale frame through `ascii_lut`.
+
+    Returns a `uint8` buffer with a newline column for a byte table, otherwise the rows as strings."""
+    if not isinstance(ascii_lut, np.ndarray):
+        return ["".join([ascii_lut[pixel] for pixel in row]) for row in gray_frame.tolist()]
+    height, width = gray_frame.shape
+    buffer = np.empty((height, width+1), dtype=np.uint8)
+    np.take(ascii_lut, gray_frame, out=buffer[:, :width])
+    buffer[:, width] = NEWLINE
+    return buffer
+
+def join_ascii_frame(mapped_frame: Union[np.ndarray, List[str]]) -> str:
+    if isinstance(mapped_frame, np.ndarray):
+        return mapped_frame.tobytes()[:-1].decode("latin-1")
+    return "\n".join(mapped_frame)
+
+def render_ascii_frame_bytes(gray_frame: np.ndarray, ascii_lut: np.ndarray) -> bytes:
+    """Maps a reduced grayscale frame through `ascii_lut`, every row ends with a newline."""
+    return map_ascii_frame(gray_frame, ascii_lut).tobytes()
+
+def render_ascii_frame(gray_frame: np.ndarray, ascii_lut: ASCII_LUT) -> str:
+    """Maps a reduced grayscale frame through `ascii_lut` to the text of the frame."""
+    return join_ascii_frame(map_ascii_frame(gray_frame, ascii_lut))
+
+def index_frame(image_frame: np.ndarray, frame_size: Tuple[int, int], index_lut: np.ndarray, reducer: REDUCER="pillow") -> np.ndarray:
+    """Reduces a decoded frame to palette indices, see `generate_index_lut`."""
+    return np.take(index_lut, reduce_frame(image_frame, frame_size, reducer))
+
+def shrink_frame(image_frame: np.ndarray, frame_size: Tuple[int, int]) -> np.ndarray:
+    """Shrinks a decoded (BGR) frame to `frame_size`, the colors are kept."""
+    small = image_frame if (image_frame.shape[1::-1] == tuple(frame_size)) \
+        else cv2.resize(image_frame, frame_size, interpolation=cv2.INTER_AREA)
+    if small.ndim == 2:
+        small = cv2.cvtColor(small, cv2.COLOR_GRAY2BGR)
+    return small
+
+def color_frame(gray_frame: np.ndarray, small_frame: np.ndarray, color_lut: ColorLUT) -> ColorFrame:
+    """Splits a reduced frame into the char plane (from `gray_frame`) and the color plane (from `small_frame`)."""
+    return ColorFrame(
+        np.take(color_lut.index_lut, gray_frame),
+        quantize_colors(small_frame, color_lut.color_mode),
+        color_lut.color_mode,
+        color_lut.ascii_chars
+    )
+
+def convert_color_frame(
+    image_frame: np.ndarray,
+    frame_size: Tuple[int, int],
+    color_lut: ColorLUT,
+    reducer: REDUCER="pillow"
+) -> ColorFrame:
+    """Shrinks a decoded (BGR) frame to `frame_size` and splits it into the char and color planes."""
+    # * The chars are the same as in the plain mode.
+    return color_frame(reduce_frame(image_frame, frame_size, reducer), shrink_frame(image_frame, frame_size), color_lut)
+
+def frame_digest(*planes: np.ndarray) -> bytes:
+    """A short hash of reduced frames, equal frames have equal digests."""
+    digest = hashlib.blake2b(digest_size=16)
+    for plane in planes:
+        digest.update(np.ascontiguousarray(plane))
+    return digest.digest()
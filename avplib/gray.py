@@ -0,0 +1,208 @@
+import os
+import json
+import glob
+import hashlib
+import tempfile
+import numpy as np
+# > Typing
+from typing import Iterator, Optional, Tuple, List, Dict, Any
+# > Local Imports
+from .cache import CACHE_SIZE
+from .color import PaletteLUT
+
+# ! Constants
+GRAY_SUFFIX = ".gray"
+META_SUFFIX = ".json"
+
+# ! Classes
+class GrayLUT(PaletteLUT):
+    """The palette of every gray level, a frame converted with it is its reduced grayscale frame."""
+    def __init__(self) -> None:
+        self.ascii_chars = []
+        self.index_lut = np.arange(256, dtype=np.uint8)
+
+class GrayFrames:
+    """Reduced grayscale frames of one source, memory-mapped from a `GrayCache` entry.
+
+    Any palette can be mapped from them, at their resolution or at any smaller one. A smaller frame is
+    shrunk from the stored one, a few of its chars can differ from a conversion of the video itself."""
+    def __init__(self, path: str, meta: Dict[str, Any]) -> None:
+        self.path = path
+        self.frame_size: Tuple[int, int] = tuple(meta["res"])
+        width, height = self.frame_size
+        shape = (meta["count"], height, width)
+        self.frames = np.memmap(path, dtype=np.uint8, mode="r", shape=shape) \
+            if (meta["count"] > 0) else np.zeros(shape, dtype=np.uint8)
+        self.repeats = np.ones(meta["count"], dtype=np.uint32)
+        for record, repeats in meta["repeats"]:
+            self.repeats[record] = repeats
+
+    def __len__(self) -> int:
+        return int(self.repeats.sum())
+
+    def reduced(self, frame_size: Tuple[int, int], reducer: str="pillow") -> Iterator[np.ndarray]:
+        """The stored frames shrunk to `frame_size`, they are views of the mapping when the size is the same."""
+        from .engine import reduce_frame
+        for gray_frame in self.frames:
+            yield reduce_frame(gray_frame, frame_size, reducer)
+
+    def to_store(self, frame_size: Tuple[int, int], ascii_chars: List[str], reducer: str="pillow"):
+        """All frames as a `FrameStore` of `ascii_chars` in one vectorized mapping."""
+        from .color import generate_index_lut
+        from .store import FrameStore
+        gray_frames = self.frames if (tuple(frame_size) == self.frame_size) \
+            else np.stack(list(self.reduced(frame_size, reducer))) if (len(self.frames) > 0) \
+            else np.zeros((0, frame_size[1], frame_size[0]), dtype=np.uint8)
+        return FrameStore.from_indices(np.take(generate_index_lut(ascii_chars), gray_frames), self.repeats, ascii_chars)
+
+    def iter_runs(self, frame_size: Tuple[int, int], ascii_lut, reducer: str="pillow") -> Iterator[Tuple[str, int]]:
+        """`(frame, repeats)` runs of the text frames, see `engine.generate_ascii_lut`."""
+        from .engine import render_ascii_frame
+        frame, count = None, 0
+        for gray_frame, repeats in zip(self.reduced(frame_size, reducer), self.repeats.tolist()):
+            text_frame = render_ascii_frame(gray_frame, ascii_lut)
+            if text_frame == frame:
+                count += repeats
+                continue
+            if frame is not None:
+                yield frame, count
+            frame, count = text_frame, repeats
+        if frame is not None:
+            yield frame, count
+
+class GrayWriter:
+    """Appends reduced frames to a temporary file, the entry becomes visible on `commit` only."""
+    def __init__(self, cache: "GrayCache", key: str, frame_size: Tuple[int, int]) -> None:
+        self.cache = cache
+        self.key = key
+        self.frame_size = tuple(frame_size)
+        fd, self.temp_path = tempfile.mkstemp(suffix=".tmp", dir=cache.cache_dir)
+        self.file = os.fdopen(fd, "wb")
+        self.last: Optional[np.ndarray] = None
+        # * [record, repeats] of every frame shown for more than one frame.
+        self.repeats: List[List[int]] = []
+        self.count = 0
+
+    def append(self, gray_frame: np.ndarray, repeats: int=1) -> None:
+        if (self.last is not None) and np.array_equal(self.last, gray_frame):
+            if (len(self.repeats) > 0) and (self.repeats[-1][0] == self.count - 1):
+                self.repeats[-1][1] += repeats
+            else:
+                self.repeats.append([self.count - 1, repeats + 1])
+            return
+        if gray_frame.shape[::-1] != self.frame_size:
+            raise ValueError(f"Frame of the size {gray_frame.shape[::-1]} in a store of {self.frame_size}")
+        self.file.write(np.ascontiguousarray(gray_frame).data)
+        self.last = gray_frame.copy()
+        if repeats > 1:
+            self.repeats.append([self.count, repeats])
+        self.count += 1
+
+    def commit(self) -> str:
+        path = self.cache.path(self.key, self.frame_size)
+        try:
+            self.file.close()
+            os.replace(self.temp_path, path + GRAY_SUFFIX)
+            # * The metadata is written last, an entry without it is never read.
+            with open(path + META_SUFFIX + ".tmp", "w") as meta_file:
+                json.dump({"res": list(self.frame_size), "count": self.count, "repeats": self.repeats}, meta_file)
+            os.replace(path + META_SUFFIX + ".tmp", path + META_SUFFIX)
+        except BaseException:
+            self.abort()
+            raise
+        self.cache.evict()
+        return path
+
+    def abort(self) -> None:
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+# ! Main Class
+class GrayCache:
+    """On-disk store of reduced grayscale frames, decoded once per source, frame rate and decoder.
+
+    Entries of the same source at other resolutions are kept side by side, the smallest one that covers
+    a requested resolution is used. Least recently used entries are removed over `max_size` bytes."""
+    def __init__(self, cache_dir: str, max_size: int=CACHE_SIZE) -> None:
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(path: str, fps: float, decoder: str="opencv", reducer: str="pillow", bounds: Optional[Tuple[int, int]]=None) -> str:
+        stat = os.stat(path)
+        identity = [os.path.realpath(path), stat.st_size, stat.st_mtime_ns, fps]
+        if decoder != "opencv":
+            identity.append(decoder)
+        if reducer != "pillow":
+            identity.append(reducer)
+        if bounds is not None:
+            identity.append(list(bounds))
+        return hashlib.sha256(json.dumps(identity).encode()).hexdigest()
+
+    def path(self, key: str, frame_size: Tuple[int, int]) -> str:
+        """Path of an entry without its suffix."""
+        return os.path.join(self.cache_dir, f"{key}-{frame_size[0]}x{frame_size[1]}")
+
+    def sizes(self, key: str) -> List[Tuple[int, int]]:
+        sizes = []
+        for meta_path in glob.glob(os.path.join(glob.escape(self.cache_dir), f"{key}-*{META_SUFFIX}")):
+            width, height = os.path.basename(meta_path)[len(key)+1:-len(META_SUFFIX)].split("x")
+            sizes.append((int(width), int(height)))
+        return sizes
+
+    def get(self, key: str, frame_size: Tuple[int, int]) -> Optional[GrayFrames]:
+        sizes = [size for size in self.sizes(key) if (size[0] >= frame_size[0]) and (size[1] >= frame_size[1])]
+        for size in sorted(sizes, key=lambda size: size[0] * size[1]):
+            path = self.path(key, size)
+            try:
+                with open(path + META_SUFFIX) as meta_file:
+                    gray_frames = GrayFrames(path + GRAY_SUFFIX, json.load(meta_file))
+            except (OSError, ValueError, KeyError):
+                continue
+            os.utime(path + META_SUFFIX)
+            return gray_frames
+        return None
+
+    def open_writer(self, key: str, frame_size: Tuple[int, int]) -> GrayWriter:
+        return GrayWriter(self, key, frame_size)
+
+    def entries(self) -> List[Tuple[str, int, float]]:
+        """`(path, size, last use)` of every entry, the path is without its suffix."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(META_SUFFIX):
+                path = entry.path[:-len(META_SUFFIX)]
+                try:
+                    size = os.path.getsize(path + GRAY_SUFFIX) + entry.stat().st_size
+                except OSError:
+                    continue
+                entries.append((path, size, entry.stat().st_mtime))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for path, size, used in self.entries())
+
+    def _remove(self, path: str) -> None:
+        for suffix in (META_SUFFIX, GRAY_SUFFIX):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def evict(self) -> None:
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for path, size, used in entries)
+        for path, size, used in entries:
+            if total <= self.max_size:
+                break
+            try:
+                self._remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self) -> None:
+        for path, size, used in self.entries():
+            self._remove(path)
@@ -0,0 +1,157 @@
+import sys
+import numpy as np
+# > Typing
+from typing import Optional, List, BinaryIO, Union
+# > Local Imports
+from .color import ColorFrame, RESET, color_escapes
+
+# ! Constants
+HIDE_CURSOR = b"\x1b[?25l"
+SHOW_CURSOR = b"\x1b[?25h"
+CLEAR_SCREEN = b"\x1b[2J"
+CURSOR_HOME = b"\x1b[H"
+CURSOR_POSITION = b"\x1b[%d;%dH"
+# * Unchanged gaps shorter than a cursor jump are cheaper to rewrite.
+MERGE_GAP = 8
+
+# ! Classes
+class AnsiRenderer:
+    """Double buffered terminal renderer, only the changed runs of cells are written.
+
+    Each frame costs a single `write` of ANSI cursor positioning sequences and text."""
+    def __init__(self, stream: Optional[BinaryIO]=None, merge_gap: int=MERGE_GAP) -> None:
+        self.stream: BinaryIO = stream or sys.stdout.buffer
+        self.merge_gap = merge_gap
+        self.prev_grid: Optional[np.ndarray] = None
+        self.prev_rows: Optional[List[str]] = None
+        self.prev_color: Optional[ColorFrame] = None
+        self.height = 0
+
+    def __enter__(self) -> "AnsiRenderer":
+        self.stream.write(HIDE_CURSOR + CLEAR_SCREEN)
+        self.stream.flush()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stream.write(CURSOR_POSITION % (self.height + 1, 1) + SHOW_CURSOR)
+        self.stream.flush()
+
+    def _redraw(self, frame: str) -> bytes:
+        self.height = frame.count("\n") + 1
+        return CURSOR_HOME + frame.encode().replace(b"\n", b"\r\n")
+
+    def _diff_grid(self, data: bytes, grid: np.ndarray) -> bytes:
+        height, width = grid.shape
+        changed = np.flatnonzero((grid != self.prev_grid).ravel())
+        if len(changed) == 0:
+            return b""
+        rows = changed // width
+        breaks = np.flatnonzero((np.diff(changed) > self.merge_gap) | (np.diff(rows) != 0))
+        starts = changed[np.concatenate(([0], breaks + 1))].tolist()
+        ends = (changed[np.concatenate((breaks, [len(changed) - 1]))] + 1).tolist()
+        output = []
+        for start, end in zip(starts, ends):
+            row, col = divmod(start, width)
+            offset = row * (width + 1)
+            output.append(CURSOR_POSITION % (row + 1, col + 1))
+            output.append(data[offset + col:offset + end - row * width])
+        return b"".join(output)
+
+    def _redraw_view(self, frame: memoryview) -> bytes:
+        self.height, width = frame.shape[0], frame.shape[1] - 1
+        data = frame.cast("B")
+        output = []
+        for row in range(self.height):
+            output.append(CURSOR_POSITION % (row + 1, 1))
+            output.append(data[row*(width+1):row*(width+1)+width])
+        return b"".join(output)
+
+    def _render_view(self, frame: memoryview) -> bytes:
+        """A record of `AVFile.record_view`, the changed cells are sliced out of it without decoding the frame."""
+        grid = np.asarray(frame)[:, :-1]
+        if (self.prev_grid is not None) and (self.prev_grid.shape == grid.shape):
+            output = self._diff_grid(frame.cast("B"), grid)
+        else:
+            output = self._redraw_view(frame)
+        self.prev_grid, self.prev_rows, self.prev_color = grid, None, None
+        return output
+
+    def _diff_rows(self, rows: List[str]) -> bytes:
+        output = []
+        for idx, row in enumerate(rows):
+            if row != self.prev_rows[idx]:
+                output.append(CURSOR_POSITION % (idx + 1, 1))
+                output.append(row.encode())
+        return b"".join(output)
+
+    def _diff_color(self, frame: ColorFrame) -> bytes:
+        height, width = frame.shape
+        changed = np.flatnonzero(((frame.chars != self.prev_color.chars) | (frame.colors != self.prev_color.colors)).ravel())
+        if len(changed) == 0:
+            return b""
+        rows = changed // width
+        breaks = np.flatnonzero((np.diff(changed) > self.merge_gap) | (np.diff(rows) != 0))
+        starts = changed[np.concatenate(([0], breaks + 1))].tolist()
+        ends = (changed[np.concatenate((breaks, [len(changed) - 1]))] + 1).tolist()
+        data, cell_starts, cell_ends = frame.layout()
+        flat = frame.colors.ravel()
+        color_starts = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+        escapes = color_escapes(frame.color_mode)
+        output, current = [], -1
+        for start, end in zip(starts, ends):
+            row, col = divmod(start, width)
+            output.append(CURSOR_POSITION % (row + 1, col + 1))
+            # * A changed run is split where the color changes, the escape is skipped when the color is already set.
+            bounds = color_starts[np.searchsorted(color_starts, start, "right"):np.searchsorted(color_starts, end, "left")]
+            bounds = [start] + bounds.tolist() + [end]
+            for run_start, run_end in zip(bounds, bounds[1:]):
+                color = int(flat[run_start])
+                if color != current:
+                    output.append(escapes[color])
+                    current = color
+                output.append(data[cell_starts[run_start]:cell_ends[run_end - 1]])
+        output.append(RESET)
+        return b"".join(output)
+
+    def _render_color(self, frame: ColorFrame) -> bytes:
+        if (self.prev_color is not None) and (self.prev_color.shape == frame.shape) \
+                and (self.prev_color.color_mode == frame.color_mode):
+            output = self._diff_color(frame)
+        else:
+            self.height = frame.shape[0]
+            output = CURSOR_HOME + frame.to_bytes().replace(b"\n", b"\r\n")
+        self.prev_grid, self.prev_rows, self.prev_color = None, None, frame
+        return output
+
+    def render(self, frame: Union[str, ColorFrame, memoryview]) -> None:
+        if isinstance(frame, ColorFrame):
+            self.stream.write(self._render_color(frame))
+            self.stream.flush()
+            return
+        if isinstance(frame, memoryview):
+            self.stream.write(self._render_view(frame))
+            self.stream.flush()
+            return
+        self.prev_color = None
+        if frame.isascii():
+            data = frame.encode()
+            width = data.find(b"\n")
+            width = len(data) if (width < 0) else width
+            if (len(data) + 1) % (width + 1) == 0:
+                grid = np.frombuffer(data + b"\n", dtype=np.uint8).reshape(-1, width + 1)[:, :width]
+                if (self.prev_grid is not None) and (self.prev_grid.shape == grid.shape):
+                    output = self._diff_grid(data, grid)
+                else:
+                    output = self._redraw(frame)
+                self.prev_grid, self.prev_rows = grid, None
+                self.stream.write(output)
+                self.stream.flush()
+                return
+        rows = frame.split("\n")
+        if (self.prev_rows is not None) and (len(self.prev_rows) == len(rows)):
+            output = self._diff_rows(rows)
+        else:
+            output = self._redraw(frame)
+        self.prev_grid, self.prev_rows = None, rows
+        self.stream.write(output)
+        self.stream.flush()
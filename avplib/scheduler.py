@@ -0,0 +1,109 @@
+import time
+# > Typing
+from typing import Iterable, Iterator, Dict, Any, TypeVar, Tuple
+
+# ! Types
+FT = TypeVar("FT")
+
+# ! Constants
+# * `time.sleep` may oversleep by about a millisecond, the rest is waited actively.
+SPIN_TIME = 0.002
+
+# ! Clocks
+class MonotonicClock:
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __call__(self) -> float:
+        return time.perf_counter() - self.start
+
+class AudioClock:
+    """Playback position of `pygame.mixer.music`, interpolated between its coarse updates."""
+    def __init__(self) -> None:
+        import pygame
+        self.music = pygame.mixer.music
+        self.fallback = MonotonicClock()
+        self.last_pos = -1
+        self.anchor = (0.0, 0.0)
+
+    def __call__(self) -> float:
+        pos = self.music.get_pos()
+        if pos < 0:
+            return self.fallback()
+        now = time.perf_counter()
+        if pos != self.last_pos:
+            self.last_pos, self.anchor = pos, (now, pos / 1000)
+        return self.anchor[1] + (now - self.anchor[0])
+
+# ! Stats
+class PlaybackStats:
+    def __init__(self) -> None:
+        self.shown = 0
+        self.held = 0
+        self.dropped = 0
+        self.late = 0
+        self.drift_sum = 0.0
+        self.drift_max = 0.0
+
+    def add_drift(self, drift: float) -> None:
+        self.drift_sum += abs(drift)
+        self.drift_max = max(self.drift_max, abs(drift))
+
+    @property
+    def drift_avg(self) -> float:
+        return (self.drift_sum / self.shown) if (self.shown > 0) else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "shown": self.shown,
+            "held": self.held,
+            "dropped": self.dropped,
+            "late": self.late,
+            "drift_avg": self.drift_avg,
+            "drift_max": self.drift_max
+        }
+
+# ! Scheduler
+class PlaybackScheduler:
+    """Paces frames against a master clock (audio or monotonic).
+
+    Frames more than one period behind the clock are dropped,
+    frames ahead of it are held until their time comes.
+    A frame of a run is drawn once and stays on screen for the periods of its repeats."""
+    def __init__(self, fps: float, clock=None) -> None:
+        self.fps = fps
+        self.period = 1 / fps
+        self.clock = clock or MonotonicClock()
+        self.stats = PlaybackStats()
+
+    def wait(self, due: float) -> None:
+        delay = due - self.clock()
+        if delay > SPIN_TIME:
+            time.sleep(delay - SPIN_TIME)
+        while self.clock() < due:
+            pass
+
+    def schedule(self, frames: Iterable[FT]) -> Iterator[FT]:
+        return self.schedule_runs((frame, 1) for frame in frames)
+
+    def schedule_runs(self, runs: Iterable[Tuple[FT, int]]) -> Iterator[FT]:
+        """Yields the frame of every `(frame, repeats)` run when it is due, nothing while it is held."""
+        idx = 0
+        for frame, repeats in runs:
+            due, last = idx * self.period, (idx + repeats - 1) * self.period
+            idx += repeats
+            now = self.clock()
+            if now - last > self.period:
+                self.stats.dropped += repeats
+                continue
+            if now < due:
+                self.wait(due)
+            elif now - due > self.period:
+                # * A run that started late is drawn at the period of it that is due now.
+                due += int((now - due) / self.period) * self.period
+            if now - due > self.period / 2:
+                self.stats.late += 1
+            self.stats.add_drift(self.clock() - due)
+            self.stats.shown += 1
+            self.stats.held += repeats - 1
+            yield frame
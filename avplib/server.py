@@ -0,0 +1,280 @@
+import time
+import socket
+import asyncio
+# > Typing
+from typing import Iterable, Iterator, Callable, Optional, Tuple, Union, List, Dict, Any, Set
+# > Local Imports
+from .avf import AVFile
+from .color import ColorFrame
+from .render import HIDE_CURSOR, SHOW_CURSOR, CLEAR_SCREEN, CURSOR_HOME
+from .units import DEFAULT_HOST, DEFAULT_PORT
+
+# ! Types
+FRAME = Union[str, ColorFrame]
+RUN = Tuple[FRAME, int]
+
+# ! Constants
+# * IAC WILL ECHO, IAC WILL SUPPRESS-GO-AHEAD: a telnet client stops its local echo and line buffering.
+TELNET_HELLO = b"\xff\xfb\x01\xff\xfb\x03"
+# * Bytes queued in the transport (and in the kernel) before `drain` waits,
+# * a slow client starts to lose frames past them instead of getting old ones.
+WRITE_BUFFER = 16 * 1024
+
+# > Functions
+def encode_frame(frame: FRAME) -> bytes:
+    """A whole frame as terminal output for a socket, every client gets the same bytes."""
+    data = frame.to_bytes() if isinstance(frame, ColorFrame) else frame.encode()
+    # * UTF-8 never contains the telnet IAC byte (0xFF), nothing has to be escaped.
+    return CURSOR_HOME + data.replace(b"\n", b"\r\n")
+
+def avf_runs(path: str) -> Iterator[RUN]:
+    avfile = AVFile(path, "r")
+    try:
+        yield from avfile.iter_runs()
+    finally:
+        avfile.close()
+
+def video_runs(video, frame_size: Tuple[int, int], prefetch: int=64) -> Iterator[RUN]:
+    """Runs of an `AVP` converted in the background, see `AVP.iter_ascii_runs`."""
+    with video.iter_ascii_runs(frame_size, prefetch) as runs:
+        yield from runs
+
+# ! Sources
+class RecordedSource:
+    """A `source` of `BroadcastServer` that is converted once.
+
+    The first pass streams the runs of `source` and keeps them in a `FrameStore`, the next passes replay
+    the store. A pass that was not played to the end is not kept, the next one calls `source` again."""
+    def __init__(self, source: Callable[[], Iterable[RUN]], ascii_chars: List[str], color_mode: str="none") -> None:
+        self.source = source
+        self.ascii_chars = ascii_chars
+        self.color_mode = color_mode
+        self.store = None
+
+    def __call__(self) -> Iterator[RUN]:
+        if self.store is not None:
+            yield from self.store.runs()
+            return
+        from .store import FrameStore
+        store = FrameStore(self.ascii_chars, self.color_mode)
+        for frame, repeats in self.source():
+            store.append(frame, repeats)
+            yield frame, repeats
+        self.store = store
+
+# ! Stats
+class ClientStats:
+    def __init__(self, peer: str) -> None:
+        self.peer = peer
+        self.connected = time.perf_counter()
+        self.disconnected: Optional[float] = None
+        self.sent = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+
+    def add_lag(self, lag: float) -> None:
+        self.lag_sum += lag
+        self.lag_max = max(self.lag_max, lag)
+
+    @property
+    def lag_avg(self) -> float:
+        return (self.lag_sum / self.sent) if (self.sent > 0) else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "peer": self.peer,
+            "seconds": (self.disconnected or time.perf_counter()) - self.connected,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "bytes": self.bytes,
+            "lag_avg": self.lag_avg,
+            "lag_max": self.lag_max
+        }
+
+# ! Classes
+class BroadcastClient:
+    """One connection, it only holds the newest frame that it has not written yet.
+
+    A frame published while the previous one is still being written replaces it and counts as dropped."""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        peer = writer.get_extra_info("peername")
+        self.stats = ClientStats(f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else str(peer))
+        self.pending: Optional[Tuple[float, bytes]] = None
+        self.ready = asyncio.Event()
+        self.closed = False
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, WRITE_BUFFER)
+
+    def offer(self, published: float, data: bytes) -> None:
+        if self.pending is not None:
+            self.stats.dropped += 1
+        self.pending = (published, data)
+        self.ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.ready.set()
+
+    async def _read(self) -> None:
+        """Input of the client is ignored, an end of stream closes the connection."""
+        try:
+            while await self.reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        self.close()
+
+    async def _write(self) -> None:
+        self.writer.write(TELNET_HELLO + HIDE_CURSOR + CLEAR_SCREEN)
+        await self.writer.drain()
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            if self.closed:
+                break
+            if self.pending is None:
+                continue
+            (published, data), self.pending = self.pending, None
+            self.writer.write(data)
+            await self.writer.drain()
+            self.stats.sent += 1
+            self.stats.bytes += len(data)
+            self.stats.add_lag(time.perf_counter() - published)
+
+    async def serve(self) -> None:
+        reading = asyncio.create_task(self._read())
+        try:
+            await self._write()
+            self.writer.write(CURSOR_HOME + SHOW_CURSOR)
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            reading.cancel()
+            self.stats.disconnected = time.perf_counter()
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+# ! Main Class
+class BroadcastServer:
+    """Plays one stream of `(frame, repeats)` runs to every connected TCP client (telnet, netcat, ...).
+
+    `source` is called for every pass of the video. Every frame is encoded once and shared by all
+    connections; a client that can not keep up loses frames and does not hold up the others.
+    A client that connects gets the last published frame at once, not only with the next one."""
+    def __init__(
+        self,
+        source: Callable[[], Iterable[RUN]],
+        fps: float,
+        host: str=DEFAULT_HOST,
+        port: int=DEFAULT_PORT,
+        repeat: bool=False,
+        on_connect: Optional[Callable[[ClientStats], None]]=None,
+        on_disconnect: Optional[Callable[[ClientStats], None]]=None
+    ) -> None:
+        self.source = source
+        self.period = 1 / fps
+        self.host = host
+        self.port = port
+        self.repeat = repeat
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.clients: Set[BroadcastClient] = set()
+        self.history: List[ClientStats] = []
+        self.published = 0
+        self.late = 0
+        self.last: Optional[bytes] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.started = asyncio.Event()
+
+    def publish(self, data: bytes) -> None:
+        published = time.perf_counter()
+        self.published += 1
+        self.last = data
+        for client in self.clients:
+            client.offer(published, data)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = BroadcastClient(reader, writer)
+        self.clients.add(client)
+        if self.last is not None:
+            client.offer(time.perf_counter(), self.last)
+        if self.on_connect is not None:
+            self.on_connect(client.stats)
+        try:
+            await client.serve()
+        finally:
+            self.clients.discard(client)
+            self.history.append(client.stats)
+            if self.on_disconnect is not None:
+                self.on_disconnect(client.stats)
+
+    @staticmethod
+    def _next(runs: Iterator[RUN]) -> Optional[Tuple[bytes, int]]:
+        for frame, repeats in runs:
+            return encode_frame(frame), repeats
+        return None
+
+    async def _play(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            runs = iter(self.source())
+            try:
+                start, idx = loop.time(), 0
+                while True:
+                    # * Reading and converting frames blocks, it runs off the event loop.
+                    item = await loop.run_in_executor(None, self._next, runs)
+                    if item is None:
+                        break
+                    data, repeats = item
+                    delay = start + idx * self.period - loop.time()
+                    idx += repeats
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    elif -delay > repeats * self.period:
+                        self.late += 1
+                        continue
+                    self.publish(data)
+            finally:
+                try:
+                    runs.close()
+                except (AttributeError, ValueError):
+                    # * No `close`, or still running in the executor when the playback was cancelled.
+                    pass
+            if not self.repeat:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of the server and of every client that is or was connected."""
+        return {
+            "published": self.published,
+            "late": self.late,
+            "clients": [stats.to_dict() for stats in self.history + [client.stats for client in self.clients]]
+        }
+
+    async def run(self, close_timeout: float=1.0) -> None:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started.set()
+        try:
+            await self._play()
+        finally:
+            self.server.close()
+            for client in list(self.clients):
+                client.close()
+            deadline = time.perf_counter() + close_timeout
+            while (len(self.clients) > 0) and (time.perf_counter() < deadline):
+                await asyncio.sleep(0.01)
+            # * A client that stopped reading never finishes its last write.
+            for client in list(self.clients):
+                client.writer.transport.abort()
+            await self.server.wait_closed()
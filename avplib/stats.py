@@ -0,0 +1,57 @@
+import time
+from threading import Lock
+from contextlib import contextmanager
+# > Typing
+from typing import Dict, Any, Iterator, List
+
+# ! Constants
+STAGES = [
+    "decode", "reduce", "hash", "map", "join", "queue_wait", "ipc",
+    "delta_encode", "compress", "decompress", "delta_decode", "audio", "write"
+]
+
+# ! Main Class
+class PipelineStats:
+    """Accumulated time and call count of every pipeline stage.
+
+    Stages are timed by the callers with `time.perf_counter`, an `add` is one lock and two additions."""
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    def add(self, stage: str, seconds: float, count: int=1) -> None:
+        with self.lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + count
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        st = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - st)
+
+    def merge(self, data: Dict[str, Dict[str, Any]]) -> None:
+        """Adds the `to_dict()["stages"]` of another (worker process) collector."""
+        for stage, values in data.items():
+            self.add(stage, values["total"], values["count"])
+
+    def stages(self) -> List[str]:
+        return sorted(self.totals, key=lambda stage: STAGES.index(stage) if (stage in STAGES) else len(STAGES))
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "wall": time.perf_counter() - self.started,
+                "stages": {
+                    stage: {
+                        "total": self.totals[stage],
+                        "count": self.counts[stage],
+                        "mean": self.totals[stage] / max(self.counts[stage], 1)
+                    }
+                    for stage in self.stages()
+                }
+            }
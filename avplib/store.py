@@ -0,0 +1,221 @@
+import numpy as np
+# > Typing
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+# > Local Imports
+from .engine import generate_ascii_lut, render_ascii_frame
+from .color import ColorFrame, generate_index_lut, color_dtype
+
+# ! Types
+FRAME = Union[str, ColorFrame]
+RUN = Tuple[Union[FRAME, np.ndarray], int]
+
+# ! Constants
+CAPACITY = 256
+
+# ! Main Class
+class FrameStore:
+    """Converted frames as one contiguous `uint8` array of palette indices with the shape (frames, height, width).
+
+    The text of a frame is only produced when it is accessed, through the palette `ascii_chars`.
+    Colored frames keep their color plane in a second array of the same shape.
+    A frame equal to the one before it is not stored again, the repeat count of the stored frame grows instead."""
+    def __init__(self, ascii_chars: List[str], color_mode: str="none") -> None:
+        self.ascii_chars = list(ascii_chars)
+        self.color_mode = color_mode
+        self.count = 0
+        self.total = 0
+        self._chars: Optional[np.ndarray] = None
+        self._colors: Optional[np.ndarray] = None
+        self._repeats: Optional[np.ndarray] = None
+        self._ends: Optional[np.ndarray] = None
+        self._text_lut = generate_ascii_lut(self.ascii_chars)
+        self._reverse_lut: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_frames(
+        cls,
+        frames: Iterable[Union[FRAME, np.ndarray]],
+        ascii_chars: List[str],
+        color_mode: str="none"
+    ) -> "FrameStore":
+        store = cls(ascii_chars, color_mode)
+        store.extend(frames)
+        return store
+
+    @classmethod
+    def from_runs(cls, runs: Iterable[RUN], ascii_chars: List[str], color_mode: str="none") -> "FrameStore":
+        store = cls(ascii_chars, color_mode)
+        store.extend_runs(runs)
+        return store
+
+    @classmethod
+    def from_indices(
+        cls,
+        chars: np.ndarray,
+        repeats: np.ndarray,
+        ascii_chars: List[str]
+    ) -> "FrameStore":
+        """A store over an array of palette indices (frames, height, width), equal neighbours are merged into one run."""
+        store = cls(ascii_chars)
+        if len(chars) > 1:
+            starts = np.flatnonzero(np.concatenate(([True], np.any(chars[1:] != chars[:-1], axis=(1, 2)))))
+            chars, repeats = chars[starts], np.add.reduceat(repeats, starts)
+        store._chars = np.ascontiguousarray(chars, dtype=np.uint8)
+        store._repeats = np.asarray(repeats, dtype=np.uint32).copy()
+        store.count, store.total = len(store._chars), int(store._repeats.sum())
+        return store
+
+    @property
+    def shape(self) -> Optional[Tuple[int, int]]:
+        return None if (self._chars is None) else self._chars.shape[1:]
+
+    @property
+    def chars(self) -> np.ndarray:
+        """Palette indices of the stored frames, one entry per run of equal frames."""
+        return self._chars[:self.count]
+
+    @property
+    def colors(self) -> Optional[np.ndarray]:
+        return None if (self._colors is None) else self._colors[:self.count]
+
+    @property
+    def repeats(self) -> np.ndarray:
+        return np.zeros(0, dtype=np.uint32) if (self._repeats is None) else self._repeats[:self.count]
+
+    @property
+    def nbytes(self) -> int:
+        if self._chars is None:
+            return 0
+        return self.chars.nbytes + self.repeats.nbytes + (0 if (self._colors is None) else self.colors.nbytes)
+
+    def _reserve(self, shape: Tuple[int, int], count: int) -> None:
+        if self._chars is None:
+            capacity = max(count, CAPACITY)
+            self._chars = np.empty((capacity, *shape), dtype=np.uint8)
+            self._repeats = np.empty(capacity, dtype=np.uint32)
+            if self.color_mode != "none":
+                self._colors = np.empty((capacity, *shape), dtype=color_dtype(self.color_mode))
+        elif self.count + count > len(self._chars):
+            capacity = max(self.count + count, len(self._chars) * 2)
+            self._chars = np.concatenate((self.chars, np.empty((capacity - self.count, *shape), dtype=np.uint8)))
+            self._repeats = np.concatenate((self.repeats, np.empty(capacity - self.count, dtype=np.uint32)))
+            if self._colors is not None:
+                self._colors = np.concatenate((self.colors, np.empty((capacity - self.count, *shape), dtype=self._colors.dtype)))
+
+    def _parse(self, frame: str) -> np.ndarray:
+        """Palette indices of a text frame."""
+        if isinstance(self._text_lut, np.ndarray):
+            if self._reverse_lut is None:
+                self._reverse_lut = np.zeros(256, dtype=np.uint8)
+                for idx, char in reversed(list(enumerate(self.ascii_chars))):
+                    self._reverse_lut[ord(char)] = idx
+            data = frame.encode("latin-1") + b"\n"
+            width = data.index(b"\n")
+            return self._reverse_lut[np.frombuffer(data, dtype=np.uint8).reshape(-1, width + 1)[:, :width]]
+        reverse = {char: idx for idx, char in reversed(list(enumerate(self.ascii_chars)))}
+        return np.array([[reverse[char] for char in row] for row in frame.split("\n")], dtype=np.uint8)
+
+    def _is_last(self, chars: np.ndarray, colors: Optional[np.ndarray]) -> bool:
+        if (self.count == 0) or (chars.shape != self.shape):
+            return False
+        last = self.count - 1
+        return np.array_equal(self._chars[last], chars) and ((colors is None) or np.array_equal(self._colors[last], colors))
+
+    def append(self, frame: Union[FRAME, np.ndarray], repeats: int=1) -> None:
+        """Adds a text frame, a `ColorFrame` or an array of palette indices shown `repeats` times."""
+        if repeats <= 0:
+            return
+        colors = None
+        if isinstance(frame, ColorFrame):
+            chars, colors = frame.chars, frame.colors
+        elif isinstance(frame, str):
+            chars = self._parse(frame)
+        else:
+            chars = frame
+        self.total += repeats
+        self._ends = None
+        if self._is_last(chars, colors):
+            self._repeats[self.count - 1] += repeats
+            return
+        self._reserve(chars.shape, 1)
+        self._chars[self.count] = chars
+        if self._colors is not None:
+            self._colors[self.count] = colors
+        self._repeats[self.count] = repeats
+        self.count += 1
+
+    def extend(self, frames: Iterable[Union[FRAME, np.ndarray]]) -> None:
+        for frame in frames:
+            self.append(frame)
+
+    def extend_runs(self, runs: Iterable[RUN]) -> None:
+        for frame, repeats in runs:
+            self.append(frame, repeats)
+
+    def frame(self, idx: int) -> FRAME:
+        """The stored frame `idx`, see `runs`."""
+        if self._colors is not None:
+            return ColorFrame(self._chars[idx], self._colors[idx], self.color_mode, self.ascii_chars)
+        return render_ascii_frame(self._chars[idx], self._text_lut)
+
+    def _records(self, frame_idx: np.ndarray) -> np.ndarray:
+        """Stored frames of the frame indices."""
+        if self._ends is None:
+            self._ends = np.cumsum(self.repeats, dtype=np.int64)
+        return np.searchsorted(self._ends, frame_idx, "right")
+
+    def runs(self) -> Iterator[Tuple[FRAME, int]]:
+        """Every stored frame once, with the number of frames it is shown for."""
+        for idx in range(self.count):
+            yield self.frame(idx), int(self._repeats[idx])
+
+    def __len__(self) -> int:
+        return self.total
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[FRAME, "FrameStore"]:
+        if isinstance(key, slice):
+            store = FrameStore(self.ascii_chars, self.color_mode)
+            frame_idx = np.arange(self.total)[key]
+            records = self._records(frame_idx)
+            if len(records) == 0:
+                return store
+            starts = np.flatnonzero(np.diff(records, prepend=-1))
+            records = records[starts]
+            # * A run of frames in order is a view, other slices copy the stored frames they need.
+            if np.all(np.diff(records) == 1):
+                records = slice(int(records[0]), int(records[-1]) + 1)
+            store._chars = self.chars[records]
+            store._colors = None if (self._colors is None) else self.colors[records]
+            store._repeats = np.diff(np.append(starts, len(frame_idx))).astype(np.uint32)
+            store.count, store.total = len(store._chars), int(store._repeats.sum())
+            return store
+        if key < 0:
+            key += self.total
+        if not (0 <= key < self.total):
+            raise IndexError("frame index out of range")
+        return self.frame(int(self._records(np.array(key))))
+
+    def __iter__(self) -> Iterator[FRAME]:
+        for frame, repeats in self.runs():
+            for i in range(repeats):
+                yield frame
+
+    def repalette(self, ascii_chars: List[str]) -> "FrameStore":
+        """The same frames drawn with other chars, the index array is only copied when the palette length changes."""
+        store = FrameStore(ascii_chars, self.color_mode)
+        store.count, store.total = self.count, self.total
+        if self._chars is None:
+            return store
+        # * The arrays are cut to `count`, so an append to either store does not write into the other.
+        store._colors, store._repeats = self.colors, self.repeats.copy()
+        if len(ascii_chars) == len(self.ascii_chars):
+            store._chars = self.chars
+            return store
+        # * Every old index is moved to the new index of the middle of its brightness range.
+        old_lut, new_lut = generate_index_lut(self.ascii_chars), generate_index_lut(ascii_chars)
+        remap = np.array(
+            [new_lut[int(np.flatnonzero(old_lut == idx).mean())] if (idx in old_lut) else 0 for idx in range(len(self.ascii_chars))],
+            dtype=np.uint8
+        )
+        store._chars = remap[self.chars]
+        return store
@@ -0,0 +1,14 @@
+import os
+
+# ! Temp Detected
+class TempDetected:
+    def __init__(self) -> None:
+        self.files = []
+    def append(self, path: str) -> None: self.files.append(path)
+    def clear(self) -> None:
+        for i in self.files:
+            try: os.remove(i)
+            except: pass
+
+# > Initilation
+TEMP_DETECTOR = TempDetected()
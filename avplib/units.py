@@ -5,4 +5,23 @@ ASCII_CHARS_GRADIENTION = []
 for i in range(0, 257):
     ASCII_CHARS_GRADIENTION.append(ASCII_CHARS[i // ASCII_CHARS_GRADIENTION_K])
 
-del i
\ No newline at end of file
+del i
+# * audio_format: (soundfile format, subtype, sample width in bytes)
+AUDIO_FORMATS = {
+    "wav": ("WAV", "PCM_32", 4),
+    "flac": ("FLAC", "PCM_16", 2),
+    "ogg": ("OGG", "VORBIS", 2)
+}
+# * none: plain text, 256: xterm 6x6x6 color cube, truecolor: 15-bit RGB
+COLOR_MODES = ["none", "256", "truecolor"]
+# * Size limit of a cache directory in bytes.
+CACHE_SIZE = 1024 * 1024 * 1024
+# * Video decoders, see `decoder.open_capture`.
+DECODERS = ["opencv", "ffmpeg"]
+# * Frame reductions, see `engine.reduce_frame`.
+REDUCERS = ["pillow", "opencv"]
+# * Address of the `serve` command.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 2323
+# * Files picked up when a directory is converted.
+VIDEO_EXTENSIONS = [".mp4", ".avi", ".mkv", ".mov", ".webm", ".flv", ".wmv", ".m4v", ".mpg", ".mpeg"]
@@ -0,0 +1,138 @@
+"""Output parity of the frame engine with the original Pillow implementation, and of the decoders.
+
+Every frame of the video (a synthetic one by default) is converted with the original
+`generate_ascii_frame` and with the engine, at every size of `--sizes`, and the text must be
+the same. The frames of `reducer="opencv"` that differ are only reported.
+
+The video, and an MJPG `.avi` of it, are then converted with `--decoder opencv` and `--decoder ffmpeg`,
+plain and colored: with each decoder, a conversion from a later frame (the second one, in the middle
+of a GOP, after a keyframe and near the end) and a segmented conversion must give the frames of the
+full one. ffmpeg scales and converts the frames itself, the frames that differ from OpenCV are
+only reported. Fails (exit code 1) when any engine frame differs or a seek lands on another frame.
+
+    python benchmarks/parity.py [--video clip.mp4] [--sizes 200x60,120x30] [--frames 30]
+"""
+import os
+import sys
+import argparse
+import tempfile
+from typing import List, Tuple, Iterator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# ! Helpers
+def legacy_ascii_frame(image_frame, frame_size: Tuple[int, int], ascii_chars_gradient: List[str]) -> str:
+    """`generate_ascii_frame` as it was before the engine."""
+    ac = "".join([ascii_chars_gradient[pixel] for pixel in Image.fromarray(image_frame).convert("L").resize(frame_size).getdata()])
+    return "\n".join([ac[index:(index+frame_size[0])] for index in range(0, len(ac), frame_size[0])])
+
+def make_video(path: str, count: int, size: Tuple[int, int]=(1280, 720), fourcc: str="mp4v") -> None:
+    """Noise over moving gradients, every rounding step of the luma and the resampling is exercised."""
+    width, height = size
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), 30, size)
+    yy, xx = np.mgrid[0:height, 0:width]
+    for i in range(count):
+        frame = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+        frame[..., 0] += ((xx + i * 4) % 192).astype(np.uint8)
+        frame[..., 1] += ((yy + i * 2) % 192).astype(np.uint8)
+        writer.write(frame)
+    writer.release()
+
+def convert(video: str, size: Tuple[int, int], color_mode: str, decoder: str, start: int=None, segmented: bool=False) -> List[bytes]:
+    """Every frame of the conversion of `video`, from the frame `start` to its end."""
+    from avplib.avplib import AVP
+    avp = AVP(video, color_mode=color_mode, decoder=decoder)
+    if start is not None:
+        avp.set_bounds(start)
+    if segmented:
+        store = avp.get_ascii_frames_segmented(size, lambda complited, total: None, processes=2)
+    else:
+        store = avp.get_ascii_frames(size, lambda complited, total: None)
+    return [(frame.encode() if isinstance(frame, str) else frame.tobytes()) for frame in store]
+
+def differences(a: List[bytes], b: List[bytes]) -> int:
+    return sum(x != y for x, y in zip(a, b)) + abs(len(a) - len(b))
+
+def read_frames(path: str, count: int) -> Iterator[np.ndarray]:
+    capture = cv2.VideoCapture(path)
+    for i in range(count):
+        ret, frame = capture.read()
+        if not ret:
+            break
+        yield frame
+    capture.release()
+
+# ! Main
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", default=None, help="Video to compare on (synthetic by default).")
+    parser.add_argument("--sizes", default="200x60,120x30,80x20", help="ASCII frame sizes.")
+    parser.add_argument("--frames", type=int, default=30, help="Frames compared at every size.")
+    args = parser.parse_args()
+
+    from avplib.avplib import generate_ascii_frame, generate_ascii_chars_gradient
+    from avplib.engine import generate_ascii_lut, reduce_frame, render_ascii_frame
+    from avplib.units import ASCII_CHARS_GRADIENTION
+    sizes = [tuple(int(n) for n in size.split("x")) for size in args.sizes.split(",")]
+    gradients = {"default": ASCII_CHARS_GRADIENTION, "short": generate_ascii_chars_gradient(list(" .:-=+*#%@"))}
+
+    from avplib.decoder import find_ffmpeg
+    failed = 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video = args.video
+        if video is None:
+            video = os.path.join(temp_dir, "parity.mp4")
+            make_video(video, args.frames)
+        frames = list(read_frames(video, args.frames))
+
+        for name, gradient in gradients.items():
+            for size in sizes:
+                differing = sum(legacy_ascii_frame(frame, size, gradient) != generate_ascii_frame(frame, size, gradient) for frame in frames)
+                failed += differing
+                print(f"engine/{name}/{size[0]}x{size[1]}".ljust(40), f"{differing} of {len(frames)} frames differ")
+                # * The OpenCV reduction is not meant to be exact, its differing frames are only reported.
+                differing = sum(
+                    legacy_ascii_frame(frame, size, gradient) != render_ascii_frame(reduce_frame(frame, size, "opencv"), generate_ascii_lut(gradient))
+                    for frame in frames
+                )
+                print(f"reducer/opencv/{name}/{size[0]}x{size[1]}".ljust(40), f"{differing} of {len(frames)} frames differ (expected)")
+
+        videos = [video]
+        if args.video is None:
+            videos.append(os.path.join(temp_dir, "parity.avi"))
+            make_video(videos[-1], args.frames, fourcc="MJPG")
+        decoders = ["opencv"]
+        if find_ffmpeg() is None:
+            print("decoder/ffmpeg".ljust(40), "skipped, ffmpeg was not found")
+        else:
+            decoders.append("ffmpeg")
+        # * The second frame, in the middle of the first GOP of 12 frames, right after the second keyframe, near the end.
+        starts = sorted({2, 7, 14, max(2, len(frames) - 2)})
+        for path in videos:
+            name = os.path.splitext(os.path.basename(path))[1][1:]
+            for color_mode in ("none", "256"):
+                for size in sizes:
+                    full = {decoder: convert(path, size, color_mode, decoder) for decoder in decoders}
+                    label = f"{name}/{color_mode}/{size[0]}x{size[1]}"
+                    # * Seeks are checked at the first size only.
+                    for decoder in (decoders if (size == sizes[0]) else []):
+                        for start in starts:
+                            differing = differences(convert(path, size, color_mode, decoder, start), full[decoder][start-1:])
+                            failed += differing
+                            print(f"seek/{decoder}/{label}/from {start}".ljust(40), f"{differing} frames differ")
+                        differing = differences(convert(path, size, color_mode, decoder, segmented=True), full[decoder])
+                        failed += differing
+                        print(f"segmented/{decoder}/{label}".ljust(40), f"{differing} frames differ")
+                    if len(decoders) > 1:
+                        differing = differences(full["opencv"], full["ffmpeg"])
+                        print(f"decoders/{label}".ljust(40), f"{differing} of {len(full['opencv'])} frames differ (expected)")
+    return 1 if (failed > 0) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Import-time and CLI startup benchmark.
+
+Fails (exit code 1) when a light entry point imports one of `HEAVY_MODULES`
+or when the median time is over the given limit.
+
+    python benchmarks/startup.py [--repeat 5] [--max-ms 1500] [--json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["cv2", "moviepy", "soundfile", "pygame", "PIL"]
+PROBE = """
+import sys, time, json
+st = time.perf_counter()
+{code}
+et = time.perf_counter()
+print(json.dumps({{"time": et - st, "modules": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+CASES = {
+    "import avplib": ("import avplib", []),
+    "import avplib.avf": ("import avplib.avf", []),
+    "import avplib.__main__": ("import avplib.__main__", []),
+    "import avplib.avplib": ("import avplib.avplib", ["cv2"]),
+}
+
+def run_probe(code: str) -> Dict[str, Any]:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.check_output([sys.executable, "-c", PROBE.format(code=code, heavy=HEAVY_MODULES)], env=env)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+def run_cli(args: List[str]) -> float:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    st = time.perf_counter()
+    subprocess.check_call([sys.executable, "-m", "avplib", *args], env=env, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - st
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="Limit for the median of every case.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+    
+    results, failed = {}, False
+    for name, (code, allowed) in CASES.items():
+        probes = [run_probe(code) for i in range(args.repeat)]
+        modules = sorted(set(m for probe in probes for m in probe["modules"]) - set(allowed))
+        results[name] = {"median_ms": statistics.median(p["time"] for p in probes) * 1000, "heavy_modules": modules}
+        failed |= len(modules) > 0
+    for name, cli_args in {"avplib play --help": ["play", "--help"], "avplib cav --help": ["cav", "--help"]}.items():
+        results[name] = {"median_ms": statistics.median(run_cli(cli_args) for i in range(args.repeat)) * 1000}
+    if args.max_ms is not None:
+        failed |= any(r["median_ms"] > args.max_ms for r in results.values())
+    
+    if args.json:
+        print(json.dumps({"python": sys.version.split()[0], "results": results, "failed": failed}, indent=4))
+    else:
+        for name, result in results.items():
+            heavy = result.get("heavy_modules")
+            print(f"{name:<28} {result['median_ms']:>9.1f} ms" + (f"  heavy: {', '.join(heavy)}" if heavy else ""))
+    return int(failed)
+
+if __name__ == "__main__":
+    sys.exit(main())
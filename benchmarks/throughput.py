@@ -0,0 +1,278 @@
+"""Throughput benchmark for conversion, the AVF container and rendering.
+
+Synthetic videos are generated with `cv2.VideoWriter`, every case runs in its
+own process so that the peak RSS belongs to that case only. The avf, codec and
+render cases start from frames converted once per video by another process and
+stored uncompressed, they only load them (`input_rss_mb` is the RSS after that).
+`ttff` (time to the first frame) is only reported by the stream conversion and
+by the AVF reads, the other cases have every frame at once at the end.
+
+    python benchmarks/throughput.py [--sizes 640x360,1280x720] [--seconds 2,5] [--res 120x30]
+                                    [--only conversion,reduction,avf,codec,render] [--output results.json]
+                                    [--compare previous.json]
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Any, Tuple, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CONVERSION_MODES = ["serial", "stream", "threading", "multiprocessing", "segmented"]
+REDUCERS = ["pillow", "opencv"]
+AVF_ENCODINGS = ["raw", "delta", "stored"]
+# * codec-level, the optional codecs are reported as unavailable when their module is missing
+AVF_CODECS = ["stored", "deflate-1", "deflate-6", "deflate-9", "bzip2-9", "lzma", "zstd-3", "zstd-19", "lz4-0"]
+RENDERERS = ["ansi", "rich"]
+VIDEO_FPS = 30
+
+# ! Helpers
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # * ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return usage / (2**20 if sys.platform == "darwin" else 2**10)
+
+def parse_size(size: str) -> Tuple[int, int]:
+    width, height = size.lower().split("x")
+    return int(width), int(height)
+
+def generate_video(path: str, size: Tuple[int, int], seconds: float) -> None:
+    import cv2
+    import numpy as np
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), VIDEO_FPS, size)
+    yy, xx = np.mgrid[0:height, 0:width]
+    for i in range(int(seconds * VIDEO_FPS)):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[..., 0] = (xx + i * 4) % 256
+        frame[..., 1] = (yy + i * 2) % 256
+        cx, cy = (i * 7) % width, height // 2
+        frame[..., 2] = np.where((xx - cx) ** 2 + (yy - cy) ** 2 < (height // 4) ** 2, 255, 0)
+        writer.write(frame)
+    writer.release()
+
+def result(frames: int, seconds: float, ttff: Optional[float]=None, **extra) -> Dict[str, Any]:
+    return {
+        "frames": frames,
+        "seconds": seconds,
+        "fps": (frames / seconds) if (seconds > 0) else None,
+        "ttff": ttff,
+        "peak_rss_mb": peak_rss_mb(),
+        **extra
+    }
+
+# ! Cases
+def case_conversion(video: str, res: Tuple[int, int], mode: str) -> Dict[str, Any]:
+    import avplib
+    avp = avplib.AVP(video)
+    st = time.perf_counter()
+    if mode == "stream":
+        ttff, frames = None, 0
+        with avp.iter_ascii_frames(res) as stream:
+            for frame in stream:
+                if ttff is None:
+                    ttff = time.perf_counter() - st
+                frames += 1
+        return result(frames, time.perf_counter() - st, ttff)
+    method = {
+        "serial": avp.get_ascii_frames,
+        "threading": avp.get_ascii_frames_threading,
+        "multiprocessing": avp.get_ascii_frames_multiprocessing,
+        "segmented": avp.get_ascii_frames_segmented
+    }[mode]
+    frames = method(res)
+    return result(len(frames), time.perf_counter() - st)
+
+def case_reduction(video: str, res: Tuple[int, int], reducer: str) -> Dict[str, Any]:
+    import avplib
+    avp = avplib.AVP(video, reducer=reducer)
+    st = time.perf_counter()
+    frames = avp.get_ascii_frames(res)
+    return result(len(frames), time.perf_counter() - st)
+
+def prepare_frames(video: str, res: Tuple[int, int], path: str) -> None:
+    """Converts `video` once into an uncompressed AVF file for the avf, codec and render cases."""
+    import avplib
+    from avplib.avf import AVFile
+    avfile = AVFile(path, "w", "stored")
+    avfile.set_info(fps=VIDEO_FPS, res=res)
+    with avfile.open_video_writer() as writer:
+        writer.write_runs(avplib.AVP(video).get_ascii_frames(res).runs())
+    avfile.close()
+
+def _frames(path: str) -> Tuple[List[str], Optional[float]]:
+    """The prepared frames and the peak RSS after loading them."""
+    from avplib.avf import AVFile
+    avfile = AVFile(path, "r")
+    frames = list(avfile.iter_frames())
+    avfile.close()
+    return frames, peak_rss_mb()
+
+def _avf_roundtrip(frames_path: str, res: Tuple[int, int], encoding: str, codec: str, level: Optional[int]) -> Dict[str, Any]:
+    from avplib.avf import AVFile
+    frames, input_rss = _frames(frames_path)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "bench.avf")
+        st = time.perf_counter()
+        avfile = AVFile(path, "w", codec, level)
+        avfile.set_info(fps=VIDEO_FPS, res=res)
+        avfile.set_video(frames, encoding=encoding)
+        avfile.close()
+        encode_time = time.perf_counter() - st
+        size = os.path.getsize(path)
+
+        st = time.perf_counter()
+        avfile = AVFile(path, "r")
+        ttff, count = None, 0
+        for frame in avfile.iter_frames():
+            if ttff is None:
+                ttff = time.perf_counter() - st
+            count += 1
+        avfile.close()
+        decode_time = time.perf_counter() - st
+    return result(
+        count, decode_time, ttff,
+        encode_seconds=encode_time,
+        encode_fps=len(frames) / encode_time,
+        file_size=size,
+        input_rss_mb=input_rss
+    )
+
+def case_avf(frames_path: str, res: Tuple[int, int], encoding: str) -> Dict[str, Any]:
+    return _avf_roundtrip(frames_path, res, encoding, "deflate", None)
+
+def case_codec(frames_path: str, res: Tuple[int, int], variant: str) -> Dict[str, Any]:
+    from avplib.compression import codec_available
+    codec, _, level = variant.partition("-")
+    if not codec_available(codec):
+        return {"error": "unavailable"}
+    return _avf_roundtrip(frames_path, res, "raw", codec, int(level) if level else None)
+
+def case_render(frames_path: str, res: Tuple[int, int], renderer: str) -> Dict[str, Any]:
+    frames, input_rss = _frames(frames_path)
+    output = io.BytesIO()
+    st = time.perf_counter()
+    if renderer == "ansi":
+        from avplib.render import AnsiRenderer
+        with AnsiRenderer(output) as ansi:
+            for frame in frames:
+                ansi.render(frame)
+        written = output.tell()
+    else:
+        from rich.console import Console
+        from rich.live import Live
+        text = io.StringIO()
+        console = Console(file=text, width=res[0] + 1, height=res[1], force_terminal=True)
+        with Live("", auto_refresh=False, console=console) as live:
+            for frame in frames:
+                live.update(frame, refresh=True)
+        written = len(text.getvalue().encode())
+    return result(len(frames), time.perf_counter() - st, bytes_written=written, input_rss_mb=input_rss)
+
+# * group: (case, variants, runs on the prepared frames instead of the video)
+CASES = {
+    "conversion": (case_conversion, CONVERSION_MODES, False),
+    "reduction": (case_reduction, REDUCERS, False),
+    "avf": (case_avf, AVF_ENCODINGS, True),
+    "codec": (case_codec, AVF_CODECS, True),
+    "render": (case_render, RENDERERS, True)
+}
+
+# ! Runner
+def run_case(group: str, source: str, res: Tuple[int, int], variant: str) -> Dict[str, Any]:
+    """Runs a case in a new process, `source` is the video or the prepared frames."""
+    args = [sys.executable, os.path.abspath(__file__), "--case", json.dumps([group, source, list(res), variant])]
+    output = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if output.returncode != 0:
+        return {"error": f"exit code {output.returncode}"}
+    return json.loads(output.stdout.decode().strip().splitlines()[-1])
+
+def run_prepare(video: str, res: Tuple[int, int], path: str) -> bool:
+    args = [sys.executable, os.path.abspath(__file__), "--prepare", json.dumps([video, list(res), path])]
+    return subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+def compare(results: Dict[str, Any], previous: Dict[str, Any]) -> None:
+    for name, current in results["results"].items():
+        old = previous.get("results", {}).get(name)
+        if (old is None) or (not current.get("fps")) or (not old.get("fps")):
+            continue
+        print(f"{name:<52} {old['fps']:>9.1f} -> {current['fps']:>9.1f} fps ({current['fps'] / old['fps']:>5.2f}x)")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="640x360,1280x720", help="Resolutions of the synthetic videos.")
+    parser.add_argument("--seconds", default="2", help="Lengths of the synthetic videos in seconds.")
+    parser.add_argument("--res", default="120x30", help="ASCII frame size.")
+    parser.add_argument("--only", default=",".join(CASES), help="Groups of cases to run.")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file.")
+    parser.add_argument("--compare", default=None, help="Previous results to compare the fps with.")
+    parser.add_argument("--case", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case is not None:
+        group, source, res, variant = json.loads(args.case)
+        print(json.dumps(CASES[group][0](source, tuple(res), variant)))
+        return 0
+    if args.prepare is not None:
+        video, res, path = json.loads(args.prepare)
+        prepare_frames(video, tuple(res), path)
+        return 0
+
+    res = parse_size(args.res)
+    results: Dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "cpu_count": os.cpu_count(),
+        "res": list(res),
+        "results": {}
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in args.sizes.split(","):
+            for seconds in args.seconds.split(","):
+                video = os.path.join(temp_dir, f"{size}_{seconds}s.mp4")
+                generate_video(video, parse_size(size), float(seconds))
+                groups = args.only.split(",")
+                frames_path = os.path.join(temp_dir, f"{size}_{seconds}s.avf")
+                prepared = (not any(CASES[group][2] for group in groups)) or run_prepare(video, res, frames_path)
+                for group in groups:
+                    case, variants, on_frames = CASES[group]
+                    for variant in variants:
+                        name = f"{group}/{variant}/{size}/{seconds}s"
+                        if on_frames and (not prepared):
+                            results["results"][name] = {"error": "frames were not prepared"}
+                        else:
+                            results["results"][name] = run_case(group, frames_path if on_frames else video, res, variant)
+                        r = results["results"][name]
+                        if "error" in r:
+                            print(f"{name:<52} {r['error']}", file=sys.stderr)
+                        else:
+                            rss = "-" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.0f}"
+                            ttff = "     -" if r["ttff"] is None else f"{r['ttff']:>6.3f}"
+                            print(f"{name:<52} {r['fps']:>9.1f} fps  ttff {ttff} s  rss {rss:>5} MB", file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+    else:
+        print(json.dumps(results, indent=4))
+    if args.compare is not None:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import mmap
+import pathlib
+import pytest
+# > Typing
+from typing import List
+# > Local Imports
+from avplib.avf import AVFile
+from avplib.compression import CODECS, DEFAULT_CODEC, codec_available
+from avplib.units import ASCII_CHARS
+
+# ! Constants
+FIXTURES = pathlib.Path(__file__).parent / "fixtures"
+RES = (8, 3)
+# * The frames of `fixtures/v1.avf`, written by the AVFile of avplib 1.5 (one "\r\n\r\n"-joined entry).
+V1_FRAMES = ["@#S%\n?*+;", "@#S%\n?*+;", ",:;+\n*?%S", "    \n@@@@"]
+
+# ! Helpers
+def make_frames(count: int) -> List[str]:
+    """Text frames of `RES` that move by one char every frame."""
+    width, height = RES
+    return [
+        "\n".join("".join(ASCII_CHARS[(x + y + i) % len(ASCII_CHARS)] for x in range(width)) for y in range(height))
+        for i in range(count)
+    ]
+
+def still_frames(count: int) -> List[str]:
+    """Frames of `RES` where at most one cell changes per frame, with a cut to another picture every 40 frames."""
+    width, height = RES
+    frames, cells = [], []
+    for i in range(count):
+        if i % 40 == 0:
+            cells = [ASCII_CHARS[(i // 40 + c) % len(ASCII_CHARS)] for c in range(width * height)]
+        cells[i % len(cells)] = ASCII_CHARS[(i * 7) % len(ASCII_CHARS)]
+        frames.append("\n".join("".join(cells[y*width:(y+1)*width]) for y in range(height)))
+    return frames
+
+def write_avf(path: pathlib.Path, frames, codec: str=DEFAULT_CODEC, **kwargs) -> str:
+    avfile = AVFile(str(path), "w", codec)
+    avfile.set_info(fps=30, res=RES)
+    avfile.set_video(frames, **kwargs)
+    avfile.close()
+    return str(path)
+
+# ! Tests
+@pytest.mark.parametrize("codec", list(CODECS))
+def test_raw_roundtrip(tmp_path, codec):
+    if not codec_available(codec):
+        pytest.skip(f"the module of {codec} is not installed")
+    frames = make_frames(150)
+    avfile = AVFile(write_avf(tmp_path / "raw.avf", frames, codec, chunk_size=16))
+    try:
+        assert (avfile.version, avfile.encoding, avfile.codec.name) == (3, "raw", codec)
+        assert len(avfile) == len(frames)
+        assert avfile.get_video() == frames
+        assert [avfile.get_frame(i) for i in (37, 0, 149, -1)] == [frames[37], frames[0], frames[149], frames[-1]]
+        assert list(avfile.iter_frames(20, 40)) == frames[20:40]
+    finally:
+        avfile.close()
+
+def test_raw_frame_out_of_range(tmp_path):
+    avfile = AVFile(write_avf(tmp_path / "raw.avf", make_frames(5)))
+    try:
+        with pytest.raises(IndexError):
+            avfile.get_frame(5)
+    finally:
+        avfile.close()
+
+def test_v1_read():
+    avfile = AVFile(str(FIXTURES / "v1.avf"))
+    try:
+        assert (avfile.version, avfile.encoding) == (1, "raw")
+        assert avfile.get_info()["res"] == [4, 2]
+        assert len(avfile) == len(V1_FRAMES)
+        assert avfile.get_video() == V1_FRAMES
+        assert avfile.get_frame(2) == V1_FRAMES[2]
+        assert list(avfile.iter_runs(1)) == [(frame, 1) for frame in V1_FRAMES[1:]]
+        assert avfile.audio_format == "mp3"
+        assert avfile.get_audio_bytes() == b"ID3 not really an mp3"
+    finally:
+        avfile.close()
+
+@pytest.mark.parametrize("codec", list(CODECS))
+def test_delta_roundtrip(tmp_path, codec):
+    if not codec_available(codec):
+        pytest.skip(f"the module of {codec} is not installed")
+    frames = still_frames(150)
+    avfile = AVFile(write_avf(tmp_path / "delta.avf", frames, codec, chunk_size=16, encoding="delta"))
+    try:
+        assert (avfile.version, avfile.encoding) == (3, "delta")
+        assert avfile.get_video() == frames
+        # * Backwards and across chunks, the decoder cannot only continue from the last frame.
+        assert [avfile.get_frame(i) for i in (100, 37, 36, 149, 0)] == [frames[i] for i in (100, 37, 36, 149, 0)]
+        assert list(avfile.iter_frames(70, 90)) == frames[70:90]
+    finally:
+        avfile.close()
+
+def test_delta_smaller_than_raw(tmp_path):
+    frames = still_frames(150)
+    raw = write_avf(tmp_path / "raw.avf", frames, "stored")
+    delta = write_avf(tmp_path / "delta.avf", frames, "stored", encoding="delta")
+    assert pathlib.Path(delta).stat().st_size < pathlib.Path(raw).stat().st_size
+
+def test_stored_roundtrip_with_repeats(tmp_path):
+    frames = make_frames(6)
+    runs = [(frames[0], 3), (frames[1], 1), (frames[1], 2), (frames[2], 1), (frames[3], 4)]
+    avfile = AVFile(str(tmp_path / "stored.avf"), "w", "stored")
+    avfile.set_info(fps=30, res=RES)
+    with avfile.open_video_writer(encoding="stored") as writer:
+        writer.write_runs(runs)
+    avfile.close()
+    avfile = AVFile(str(tmp_path / "stored.avf"))
+    try:
+        assert (avfile.encoding, len(avfile), avfile.records_count) == ("stored", 11, 4)
+        assert avfile.get_video() == [frames[0]] * 3 + [frames[1]] * 3 + [frames[2]] + [frames[3]] * 4
+        assert list(avfile.iter_runs(2, 8)) == [(frames[0], 1), (frames[1], 3), (frames[2], 1), (frames[3], 1)]
+        assert avfile.get_frame(5) == frames[1]
+    finally:
+        avfile.close()
+
+def test_stored_views(tmp_path):
+    width, height = RES
+    frames = make_frames(4)
+    avfile = AVFile(write_avf(tmp_path / "stored.avf", frames + [frames[-1]], "stored", encoding="stored"))
+    try:
+        view = avfile.record_view(2)
+        # * A slice of the mapped file, not a copy.
+        assert isinstance(view.obj, mmap.mmap)
+        assert view.shape == (height, width + 1)
+        assert view.tobytes() == (frames[2] + "\n").encode()
+        views = list(avfile.iter_views(1))
+        assert [repeats for view, repeats in views] == [1, 1, 2]
+        assert [view.tobytes()[:-1].decode() for view, repeats in views] == frames[1:]
+        del view, views
+    finally:
+        avfile.close()
+
+def test_stored_needs_rows_of_equal_size(tmp_path):
+    # * A multi-byte char makes its row longer than the others.
+    with pytest.raises(ValueError):
+        write_avf(tmp_path / "stored.avf", ["█ \n  "], "stored", encoding="stored")
+    assert not (tmp_path / "stored.avf").exists()
+
+def test_abort_removes_the_file(tmp_path):
+    path = tmp_path / "aborted.avf"
+    avfile = AVFile(str(path), "w")
+    avfile.set_info(fps=30, res=RES)
+    with pytest.raises(KeyboardInterrupt):
+        with avfile.open_video_writer(encoding="stored") as writer:
+            writer.write_frames(make_frames(3))
+            raise KeyboardInterrupt
+    assert not path.exists()
+    avfile = AVFile(str(path), "w")
+    avfile.abort()
+    assert not path.exists()